@@ -0,0 +1,129 @@
+import copy
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+from rest_framework.authentication import (BaseAuthentication,
+                                           get_authorization_header)
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from reviews.models import User
+
+ROLE_CLAIM = 'role'
+CLAIMS_VERSION_CLAIM = 'claims_version'
+USER_CACHE_KEY = 'api:user:{}'
+ERROR_USER_NOT_FOUND = 'Пользователь не найден'
+
+
+class ClaimsUser(TokenUser):
+    """Пользователь, собранный из claims токена без запроса к базе."""
+
+    @property
+    def role(self):
+        return self.token[ROLE_CLAIM]
+
+    @property
+    def is_moderator(self):
+        return self.role == User.UserRoles.MODERATOR or self.is_staff
+
+    @property
+    def is_admin(self):
+        return self.role == User.UserRoles.ADMIN or self.is_superuser
+
+    def get_full_user(self):
+        return get_cached_user(self.id)
+
+
+def cache_user(user):
+    """Кладёт пользователя в кеш без хеша пароля."""
+    cached = copy.copy(user)
+    # Поле без значения в __dict__ Django считает отложенным.
+    cached.__dict__.pop('password', None)
+    cache.set(
+        USER_CACHE_KEY.format(user.pk), cached,
+        settings.JWT_USER_CACHE_TIMEOUT,
+    )
+
+
+def get_cached_user(user_id):
+    """Пользователь из кеша; при промахе читается из базы.
+
+    Кеш живёт JWT_USER_CACHE_TIMEOUT секунд: при кеше в памяти процесса
+    другие процессы узнают о смене роли не позже, чем через этот срок.
+    """
+    user = cache.get(USER_CACHE_KEY.format(user_id))
+    if user is None:
+        user = User.objects.defer('password').filter(pk=user_id).first()
+        if user is not None:
+            cache_user(user)
+    return user
+
+
+def get_full_user(user):
+    """Модель User для request.user, когда claims токена недостаточно.
+
+    Пользователь, удалённый после выдачи токена, не аутентифицирован.
+    """
+    if isinstance(user, ClaimsUser):
+        user = user.get_full_user()
+    if user is None:
+        raise AuthenticationFailed(ERROR_USER_NOT_FOUND, code='user_not_found')
+    return user
+
+
+def revoke_user_claims(user_id):
+    """Сбрасывает закешированного пользователя.
+
+    Новая версия claims хранится в базе (User.claims_version); сброс
+    кеша делает её видимой в этом процессе сразу, а не по истечении TTL.
+    """
+    cache.delete(USER_CACHE_KEY.format(user_id))
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация, которая не читает пользователя из базы.
+
+    Роль и флаги пользователя берутся из claims токена, выданного
+    GetAuthTokenView, если версия claims в токене совпадает с
+    User.claims_version закешированного пользователя. Для токенов без
+    claims или отозванных после смены роли используется сам
+    закешированный пользователь.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = get_cached_user(user_id) if user_id is not None else None
+        if user is None or not user.is_active:
+            return super().get_user(validated_token)
+        if ROLE_CLAIM in validated_token and validated_token.get(
+            CLAIMS_VERSION_CLAIM
+        ) == user.claims_version:
+            return ClaimsUser(validated_token)
+        return user
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """Статический Bearer-токен сборщика метрик из settings.METRICS_TOKEN.
+
+    Несовпадающий токен передаётся следующей аутентификации, поэтому
+    администратор может открыть метрики и со своим JWT.
+    """
+
+    def authenticate(self, request):
+        if not settings.METRICS_TOKEN:
+            return None
+        header = get_authorization_header(request).split()
+        if len(header) != 2 or header[0].lower() != b'bearer':
+            return None
+        if not constant_time_compare(
+            header[1], settings.METRICS_TOKEN.encode()
+        ):
+            return None
+        return AnonymousUser(), None
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="api"'
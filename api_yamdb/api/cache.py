@@ -0,0 +1,143 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+
+from reviews.models import User
+
+GENERATION_KEY = 'api:generation:{}'
+# Параметры, которые не меняют состав выборки и не входят в ключ COUNT.
+IGNORED_QUERY_PARAMS = (
+    'limit', 'offset', 'cursor', 'pagination', 'embed', 'comments_limit'
+)
+RESPONSE_CACHE_STATS_KEY = 'api:response-cache:{}'
+RESPONSE_CACHE_EVENTS = ('hits', 'misses')
+
+
+def generation_key(model):
+    return GENERATION_KEY.format(model._meta.label_lower)
+
+
+def get_generations(models):
+    """Возвращает поколения моделей - метки времени их последнего изменения.
+
+    Поколение, которого нет в кеше (первое обращение или вытеснение),
+    заводится заново текущим временем, что сбрасывает зависящие ключи.
+    """
+    keys = [generation_key(model) for model in models]
+    stored = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in stored}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        stored.update(missing)
+    return tuple(stored[key] for key in keys)
+
+
+def bump_generation(model):
+    """Помечает все закешированные данные модели устаревшими."""
+    key = generation_key(model)
+    current = cache.get(key, 0)
+    cache.set(key, max(time.time_ns(), current + 1), timeout=None)
+
+
+def normalized_query(request, ignored=IGNORED_QUERY_PARAMS):
+    """Параметры запроса в каноническом порядке без служебных параметров."""
+    params = getattr(request, 'query_params', request.GET)
+    return sorted(
+        (key, sorted(values))
+        for key, values in params.lists()
+        if key not in ignored
+    )
+
+
+def make_digest(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def make_key(prefix, *parts):
+    return f'api:{prefix}:{make_digest(*parts)}'
+
+
+def get_resource_version(request, models):
+    """ETag и время изменения ресурса, вычисленные по поколениям моделей.
+
+    Сериализация не требуется: версия меняется вместе с поколением любой
+    из моделей, от которых зависит представление ресурса.
+    """
+    generations = get_generations(models)
+    etag = make_digest(
+        request.path,
+        normalized_query(request, ignored=()),
+        # Accept с параметрами выбирает другое представление списка.
+        getattr(request, 'accepted_media_type', None),
+        generations,
+    )
+    last_modified = datetime.fromtimestamp(
+        max(generations) / 10 ** 9, tz=timezone.utc
+    )
+    return f'"{etag}"', last_modified
+
+
+def get_field_value(obj, path):
+    """Значение поля по пути через точку ('author.username').
+
+    Для ManyToMany возвращается отсортированный список значений по
+    связанным объектам, уже подгруженным prefetch_related.
+    """
+    name, _, rest = path.partition('.')
+    field = obj._meta.get_field(name)
+    if field.many_to_many:
+        return sorted(
+            get_field_value(item, rest) if rest else item.pk
+            for item in getattr(obj, name).all()
+        )
+    if not rest:
+        return getattr(obj, field.attname)
+    related = getattr(obj, name)
+    return None if related is None else get_field_value(related, rest)
+
+
+def get_object_version(obj, fields):
+    """ETag объекта по выводимым значениям полей fields.
+
+    Поколения моделей в ETag не входят: они заводятся в кеше каждого
+    процесса заново, и один и тот же объект получал бы в разных
+    процессах разные ETag.
+    """
+    etag = make_digest(
+        obj._meta.label_lower,
+        obj.pk,
+        [get_field_value(obj, path) for path in fields],
+    )
+    return f'"{etag}"'
+
+
+def count_event(event):
+    key = RESPONSE_CACHE_STATS_KEY.format(event)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Счётчик вытеснен между add и incr - начинаем заново.
+        cache.set(key, 1, timeout=None)
+
+
+def get_response_cache_stats():
+    """Счётчики попаданий и промахов кеша ответов для мониторинга."""
+    keys = {
+        RESPONSE_CACHE_STATS_KEY.format(event): event
+        for event in RESPONSE_CACHE_EVENTS
+    }
+    stored = cache.get_many(keys)
+    return {event: stored.get(key, 0) for key, event in keys.items()}
+
+
+def get_role(user):
+    if not user.is_authenticated:
+        return 'anonymous'
+    if user.is_admin:
+        return User.UserRoles.ADMIN
+    if user.is_moderator:
+        return User.UserRoles.MODERATOR
+    return User.UserRoles.USER
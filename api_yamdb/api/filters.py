@@ -1,26 +1,81 @@
 from django_filters import rest_framework as filters
+from rest_framework.filters import BaseFilterBackend
 
 from reviews.models import Title
+from reviews.search import search
+
+
+class LowerCaseCharFilter(filters.CharFilter):
+    """Точное сравнение с полем, хранящимся в нижнем регистре."""
+
+    def filter(self, qs, value):
+        return super().filter(qs, value.lower() if value else value)
+
+
+class LowerCaseInFilter(filters.BaseInFilter, filters.CharFilter):
+    """Список значений через запятую для поля в нижнем регистре."""
+
+    def filter(self, qs, value):
+        if value:
+            value = [item.lower() for item in value]
+        return super().filter(qs, value)
+
+
+class TitleOrderingFilter(filters.OrderingFilter):
+    """Сортировка с id в конце, чтобы страницы не пересекались."""
+
+    def filter(self, qs, value):
+        qs = super().filter(qs, value)
+        if value:
+            qs = qs.order_by(*qs.query.order_by, 'id')
+        return qs
 
 
 class TitleFilter(filters.FilterSet):
-    name = filters.CharFilter(
-        field_name='name',
-        lookup_expr='iexact'
-    )
-    category = filters.CharFilter(
-        field_name='category__slug',
-        lookup_expr='iexact'
-    )
-    genre = filters.CharFilter(
-        field_name='genre__slug',
-        lookup_expr='iexact'
-    )
-    year = filters.NumberFilter(
-        field_name='year',
-        lookup_expr='iexact'
+    name = LowerCaseCharFilter(field_name='name_lower')
+    category = LowerCaseCharFilter(field_name='category__slug')
+    category__in = LowerCaseInFilter(field_name='category__slug')
+    genre = LowerCaseCharFilter(field_name='genre__slug')
+    genre__in = LowerCaseInFilter(method='filter_genre_in')
+    year = filters.NumberFilter(field_name='year')
+    year_min = filters.NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = filters.NumberFilter(field_name='year', lookup_expr='lte')
+    rating_min = filters.NumberFilter(field_name='rating', lookup_expr='gte')
+    rating_max = filters.NumberFilter(field_name='rating', lookup_expr='lte')
+    ordering = TitleOrderingFilter(
+        fields=(
+            ('rating', 'rating'),
+            ('year', 'year'),
+            ('name_lower', 'name'),
+        )
     )
 
     class Meta:
         model = Title
         fields = '__all__'
+
+    def filter_genre_in(self, queryset, name, value):
+        # Полусоединение вместо JOIN: произведение с несколькими
+        # подходящими жанрами попадает в выборку один раз, и DISTINCT
+        # по всем колонкам не нужен ни странице, ни COUNT.
+        return queryset.filter(
+            id__in=Title.genre.through.objects.filter(
+                genre__slug__in=[slug.lower() for slug in value]
+            ).values('title_id')
+        )
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """Параметр ?search= по полнотекстовому индексу.
+
+    Результаты упорядочены по релевантности; явная сортировка
+    (?ordering=) или курсорная пагинация, применённые после этого
+    фильтра, её заменяют.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search(queryset, query)
@@ -0,0 +1,186 @@
+import json
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+
+from api.registration.token_generator import RoleAccessToken
+from api.urls import VERSION_1, router_v1
+from reviews.models import Comment, User
+
+BENCHMARK_ADMIN = 'bench_admin'
+
+
+def percentile(values, percent):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100)[percent - 1]
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = '''Нагрузочный тест GET-маршрутов API на работающем сервере.
+        Перед запуском заполните базу командой seed_catalog и запустите
+        сервер с теми же настройками. Количество SQL-запросов берётся из
+        заголовка X-Query-Count: он отдаётся при DEBUG или
+        QUERY_STATS_HEADERS. Результат сохраняется в JSON.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url', default='http://127.0.0.1:8000/api/'
+        )
+        parser.add_argument(
+            '--requests',
+            default=200,
+            type=int,
+            help='Количество запросов на каждый маршрут.'
+        )
+        parser.add_argument('--concurrency', default=8, type=int)
+        parser.add_argument(
+            '--output',
+            help='Файл для результатов, по умолчанию benchmark-<commit>.json.'
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON предыдущего запуска для сравнения p95.'
+        )
+
+    def get_routes(self):
+        """Конкретные URL для всех маршрутов router_v1."""
+        comment = Comment.objects.select_related('review').order_by(
+            'id'
+        ).first()
+        if comment is None:
+            raise CommandError(
+                'В базе нет данных: сначала выполните seed_catalog.'
+            )
+        ids = {
+            'title_id': comment.review.title_id,
+            'review_id': comment.review_id,
+        }
+        objects = {
+            'users': BENCHMARK_ADMIN,
+            'titles': ids['title_id'],
+            'titles/{title_id}/reviews': ids['review_id'],
+            'titles/{title_id}/reviews/{review_id}/comments': comment.id,
+        }
+        routes = {'users-me': f'{VERSION_1}users/me/'}
+        for prefix, viewset, basename in router_v1.registry:
+            pattern = prefix
+            for name in ids:
+                pattern = pattern.replace(f'(?P<{name}>\\d+)', f'{{{name}}}')
+            path = pattern.format(**ids)
+            routes[f'{basename}-list'] = f'{VERSION_1}{path}/'
+            if hasattr(viewset, 'retrieve') and pattern in objects:
+                routes[f'{basename}-detail'] = (
+                    f'{VERSION_1}{path}/{objects[pattern]}/'
+                )
+        return routes
+
+    def run_route(self, base_url, path, headers, count, concurrency):
+        local = threading.local()
+
+        def fetch(_):
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+                local.session.headers.update(headers)
+            started = time.perf_counter()
+            response = local.session.get(base_url + path)
+            queries = response.headers.get('X-Query-Count')
+            return (
+                time.perf_counter() - started,
+                response.status_code,
+                int(queries) if queries is not None else None,
+            )
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(fetch, range(count)))
+        elapsed = time.perf_counter() - started
+        latencies = sorted(result[0] * 1000 for result in results)
+        queries = [result[2] for result in results if result[2] is not None]
+        return {
+            'path': path,
+            'requests': count,
+            'errors': sum(1 for result in results if result[1] >= 400),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'throughput_rps': round(count / elapsed, 1),
+            # None, если сервер не отдаёт заголовок X-Query-Count.
+            'queries_per_request': (
+                round(statistics.mean(queries), 2) if queries else None
+            ),
+        }
+
+    def handle(self, *args, **options):
+        admin, _ = User.objects.get_or_create(
+            username=BENCHMARK_ADMIN,
+            defaults={
+                'email': f'{BENCHMARK_ADMIN}@yamdb.fake',
+                'role': User.UserRoles.ADMIN,
+            },
+        )
+        headers = {
+            'Authorization': f'Bearer {RoleAccessToken.for_user(admin)}'
+        }
+        commit = get_commit()
+        report = {
+            'commit': commit,
+            'started': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'concurrency': options['concurrency'],
+            'routes': {},
+        }
+        for name, path in self.get_routes().items():
+            result = self.run_route(
+                options['base_url'], path, headers,
+                options['requests'], options['concurrency'],
+            )
+            report['routes'][name] = result
+            self.stdout.write(
+                f'{name:<20} p50 {result["p50_ms"]:>8} мс  '
+                f'p95 {result["p95_ms"]:>8} мс  '
+                f'p99 {result["p99_ms"]:>8} мс  '
+                f'{result["throughput_rps"]:>8} rps  '
+                f'{str(result["queries_per_request"]):>5} SQL  '
+                f'ошибок {result["errors"]}'
+            )
+        output = options['output'] or f'benchmark-{commit or "local"}.json'
+        with open(output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(
+            self.style.SUCCESS(f'Результаты записаны в {output}')
+        )
+        if options['compare']:
+            self.compare(report, options['compare'])
+
+    def compare(self, report, path):
+        with open(path, encoding='utf-8') as file:
+            previous = json.load(file)
+        self.stdout.write(
+            f'Сравнение p95 с {previous.get("commit")} ({path}):'
+        )
+        for name, result in report['routes'].items():
+            before = previous['routes'].get(name)
+            if before is None:
+                continue
+            change = (result['p95_ms'] / before['p95_ms'] - 1) * 100
+            self.stdout.write(
+                f'{name:<20} {before["p95_ms"]:>8} -> '
+                f'{result["p95_ms"]:>8} мс ({change:+.1f}%)'
+            )
@@ -0,0 +1,53 @@
+import statistics
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+
+from reviews.models import Comment, Review, Title
+from reviews.search import get_backend, search, search_icontains
+
+SEARCHABLE_MODELS = (Title, Review, Comment)
+DEFAULT_TERMS = ('произведение', 'отзыв', 'комментарий 1')
+
+
+class Command(BaseCommand):
+    help = '''Сравнивает поиск по полнотекстовому индексу с icontains
+        на текущей базе: медианное время первой страницы и COUNT.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('terms', nargs='*', default=DEFAULT_TERMS)
+        parser.add_argument('--repeat', default=10, type=int)
+        parser.add_argument('--limit', default=10, type=int)
+
+    def measure(self, method, queryset, term, limit, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            found = method(queryset, term)
+            count = found.count()
+            list(found.values_list('pk', flat=True)[:limit])
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), count
+
+    def handle(self, *args, **options):
+        if get_backend(connection) is None:
+            raise CommandError(
+                'Полнотекстовый индекс недоступен: сравнивать не с чем.'
+            )
+        for model in SEARCHABLE_MODELS:
+            for term in options['terms']:
+                results = [
+                    self.measure(
+                        method, model.objects.all(), term,
+                        options['limit'], options['repeat'],
+                    )
+                    for method in (search, search_icontains)
+                ]
+                (fts_time, fts_count), (like_time, like_count) = results
+                self.stdout.write(
+                    f'{model._meta.model_name:<8} {term!r:<20} '
+                    f'индекс {fts_time:>8.2f} мс ({fts_count}), '
+                    f'icontains {like_time:>8.2f} мс ({like_count}), '
+                    f'x{like_time / max(fts_time, 1e-9):.1f}'
+                )
@@ -0,0 +1,213 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from .cache import get_response_cache_stats
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+UNMATCHED_ROUTE = 'unmatched'
+
+
+def get_route(request):
+    """Basename маршрута router_v1 или имя URL для прочих представлений."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED_ROUTE
+    initkwargs = getattr(match.func, 'initkwargs', {})
+    return initkwargs.get('basename') or match.url_name or UNMATCHED_ROUTE
+
+
+def get_http_request(request):
+    """HttpRequest Django для Request из DRF."""
+    return getattr(request, '_request', request)
+
+
+def add_serializer_time(request, duration):
+    if request is None:
+        return
+    request = get_http_request(request)
+    request.serializer_time = (
+        getattr(request, 'serializer_time', 0.0) + duration
+    )
+
+
+def set_page_stats(request, mode, items):
+    get_http_request(request).page_stats = (mode, items)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+                '\n', '\\n'
+            ),
+        )
+        for name, value in labels
+    )
+    return f'{{{pairs}}}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket', labels + (('le', bound),), cumulative
+        yield f'{name}_bucket', labels + (('le', '+Inf'),), self.count
+        yield f'{name}_sum', labels, self.sum
+        yield f'{name}_count', labels, self.count
+
+
+class MetricsRegistry:
+    """Агрегирует метрики запросов к API в памяти процесса.
+
+    Данные одного HTTP-запроса записываются под одной блокировкой,
+    поэтому реестр можно использовать из нескольких потоков WSGI-сервера.
+    Значения накапливаются с момента старта процесса и теряются при
+    его перезапуске, как и положено счётчикам Prometheus.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.requests = defaultdict(int)
+            self.latency = {}
+            self.queries = {}
+            self.query_time = defaultdict(float)
+            self.serializer_time = defaultdict(float)
+            self.pages = defaultdict(int)
+            self.page_items = defaultdict(int)
+
+    def observe_request(self, route, method, status, duration,
+                        queries=None, query_time=0.0, serializer_time=0.0,
+                        page_stats=None):
+        with self.lock:
+            self.requests[route, method, status] += 1
+            if route not in self.latency:
+                self.latency[route] = Histogram(LATENCY_BUCKETS)
+                self.queries[route] = Histogram(QUERY_BUCKETS)
+            self.latency[route].observe(duration)
+            if queries is not None:
+                self.queries[route].observe(queries)
+                self.query_time[route] += query_time
+            self.serializer_time[route] += serializer_time
+            if page_stats is not None:
+                mode, items = page_stats
+                self.pages[route, mode] += 1
+                self.page_items[route] += items
+
+    def collect(self):
+        """Снимок метрик: (имя, тип, справка, [(суффикс, метки, значение)])."""
+        with self.lock:
+            yield (
+                'yamdb_http_requests_total', 'counter',
+                'Обработанные HTTP-запросы.',
+                [
+                    ('', (('route', route), ('method', method),
+                          ('status', status)), count)
+                    for (route, method, status), count
+                    in sorted(self.requests.items())
+                ],
+            )
+            yield (
+                'yamdb_http_request_duration_seconds', 'histogram',
+                'Время обработки HTTP-запроса.',
+                self.histogram_samples(self.latency),
+            )
+            yield (
+                'yamdb_db_queries_per_request', 'histogram',
+                'Количество SQL-запросов на HTTP-запрос.',
+                self.histogram_samples(self.queries),
+            )
+            yield (
+                'yamdb_db_query_duration_seconds_total', 'counter',
+                'Суммарное время выполнения SQL-запросов.',
+                self.route_samples(self.query_time),
+            )
+            yield (
+                'yamdb_serializer_duration_seconds_total', 'counter',
+                'Суммарное время сериализации ответов.',
+                self.route_samples(self.serializer_time),
+            )
+            yield (
+                'yamdb_paginated_responses_total', 'counter',
+                'Ответы с пагинацией по режимам limit/offset и cursor.',
+                [
+                    ('', (('route', route), ('mode', mode)), count)
+                    for (route, mode), count in sorted(self.pages.items())
+                ],
+            )
+            yield (
+                'yamdb_page_items_total', 'counter',
+                'Объекты, отданные на страницах пагинации.',
+                self.route_samples(self.page_items),
+            )
+        yield (
+            'yamdb_response_cache_events_total', 'counter',
+            'Попадания и промахи кеша ответов API.',
+            [
+                ('', (('event', event),), count)
+                for event, count in get_response_cache_stats().items()
+            ],
+        )
+
+    @staticmethod
+    def route_samples(values):
+        return [
+            ('', (('route', route),), value)
+            for route, value in sorted(values.items())
+        ]
+
+    @staticmethod
+    def histogram_samples(histograms):
+        return [
+            (name, labels, value)
+            for route, histogram in sorted(histograms.items())
+            for name, labels, value in histogram.samples(
+                '', (('route', route),)
+            )
+        ]
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus 0.0.4."""
+        lines = []
+        for name, kind, help_text, samples in self.collect():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(
+                f'{name}{suffix}{format_labels(labels)} '
+                f'{format_value(value)}'
+                for suffix, labels, value in samples
+            )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,156 @@
+import inspect
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.fields import Field
+
+from .metrics import get_route, registry
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+
+
+class QueryBudgetExceeded(Exception):
+    """Запрос к API превысил бюджет SQL-запросов или содержит N+1."""
+
+
+def query_shape(sql):
+    """SQL без учёта длины списков параметров в IN (...)."""
+    return PLACEHOLDER_LIST.sub('%s, ...', sql)
+
+
+def serializer_field_origin():
+    """Поле сериализатора, из которого выполняется текущий SQL-запрос."""
+    frame = inspect.currentframe()
+    while frame is not None:
+        field = frame.f_locals.get('self')
+        if isinstance(field, Field) and field.field_name:
+            return f'{type(field.parent).__name__}.{field.field_name}'
+        frame = frame.f_back
+    return None
+
+
+class QueryStats:
+    """Обёртка для connection.execute_wrapper, собирающая статистику."""
+
+    def __init__(self, repeat_threshold):
+        self.repeat_threshold = repeat_threshold
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            shape = query_shape(sql)
+            self.shapes[shape] += 1
+            if self.shapes[shape] == self.repeat_threshold:
+                self.origins[shape] = serializer_field_origin()
+
+    def repeated(self):
+        """Повторяющиеся запросы одной формы - сигнатуры N+1."""
+        return {
+            shape: (count, self.origins.get(shape))
+            for shape, count in self.shapes.items()
+            if count >= self.repeat_threshold
+        }
+
+
+def get_view_name(request):
+    match = request.resolver_match
+    if match is None:
+        return None
+    view_class = getattr(match.func, 'cls', None)
+    return view_class.__name__ if view_class else match.view_name
+
+
+class QueryBudgetMiddleware:
+    """Считает SQL-запросы и время в базе на каждый HTTP-запрос.
+
+    Количество и время запросов отдаются в заголовках X-Query-Count и
+    X-Query-Time только при DEBUG или QUERY_STATS_HEADERS: они
+    раскрывают детали устройства сервиса.
+    Бюджет запросов задаётся для вьюсета в settings.QUERY_BUDGETS.
+    Превышение бюджета и повторяющиеся запросы одной формы
+    (не меньше QUERY_REPEAT_THRESHOLD раз) пишутся в лог, а при
+    QUERY_BUDGET_RAISE приводят к исключению QueryBudgetExceeded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats(settings.QUERY_REPEAT_THRESHOLD)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        request.query_stats = stats
+        if settings.DEBUG or settings.QUERY_STATS_HEADERS:
+            response['X-Query-Count'] = stats.count
+            response['X-Query-Time'] = f'{stats.duration * 1000:.1f}ms'
+        self.check_budget(request, stats)
+        return response
+
+    def check_budget(self, request, stats):
+        view_name = get_view_name(request)
+        budget = settings.QUERY_BUDGETS.get(
+            view_name, settings.QUERY_BUDGET_DEFAULT
+        )
+        problems = []
+        if stats.count > budget:
+            problems.append(
+                f'{stats.count} SQL-запросов при бюджете {budget}'
+            )
+        for shape, (count, origin) in stats.repeated().items():
+            problems.append(
+                f'N+1: {count} раз из {origin or "неизвестного места"}: '
+                f'{shape}'
+            )
+        if not problems:
+            return
+        message = (
+            f'{request.method} {request.path} ({view_name}): '
+            + '; '.join(problems)
+        )
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class MetricsMiddleware:
+    """Записывает метрики каждого HTTP-запроса в реестр api.metrics.
+
+    Должен стоять в MIDDLEWARE перед QueryBudgetMiddleware, чтобы
+    статистика SQL-запросов уже была собрана к концу обработки.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        stats = getattr(request, 'query_stats', None)
+        registry.observe_request(
+            get_route(request),
+            request.method,
+            response.status_code,
+            time.perf_counter() - started,
+            queries=stats.count if stats else None,
+            query_time=stats.duration if stats else 0.0,
+            serializer_time=getattr(request, 'serializer_time', 0.0),
+            page_stats=getattr(request, 'page_stats', None),
+        )
+        return response
@@ -1,7 +1,263 @@
+import time
+from calendar import timegm
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import ListSerializer
+
 from reviews.validators import (validate_non_reserved)
+from .cache import (count_event, get_generations, get_object_version,
+                    get_resource_version, get_role, make_key,
+                    normalized_query)
+from .metrics import add_serializer_time
+from .querysets import plan_queryset
 
 
 class UsernameValidationMixin():
     def validate_username(self, value):
         value = validate_non_reserved(value)
         return value
+
+
+class NestedRouteMixin():
+    """Родители вложенного маршрута вида titles/{title_id}/reviews/.
+
+    route_lookups связывает поля объектов вьюсета с kwargs маршрута,
+    parent_lookups - поля ближайшего родителя parent_model с ними же.
+    Список и детальный объект отбираются по всей цепочке родителей в
+    том же запросе. Родитель загружается одним запросом, который
+    проверяет всю цепочку, только когда он нужен (запись или пустая
+    страница), и запоминается на вьюсете до конца запроса. Родители,
+    не связанные друг с другом, дают 404.
+    """
+    parent_model = None
+    parent_lookups = {}
+    route_lookups = {}
+
+    def get_route_filter(self, lookups):
+        return {field: self.kwargs[kwarg] for field, kwarg in lookups.items()}
+
+    def get_parent(self):
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(
+                self.parent_model.objects.only('pk'),
+                **self.get_route_filter(self.parent_lookups),
+            )
+        return self._parent
+
+    def get_queryset(self):
+        return super().get_queryset().filter(
+            **self.get_route_filter(self.route_lookups)
+        )
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page:
+            # Пустая страница: отличаем несуществующего родителя от
+            # родителя без дочерних объектов.
+            self.get_parent()
+        return page
+
+
+class PlannedQuerysetMixin():
+    """Подгружает связи, которые выводит сериализатор, без N+1 запросов.
+
+    На чтение выбираются только выводимые колонки; запись получает
+    объект целиком, так как сигналы и save() используют все поля.
+    """
+
+    def filter_queryset(self, queryset):
+        return plan_queryset(
+            super().filter_queryset(queryset),
+            self.get_serializer_class(),
+            project=self.request.method in SAFE_METHODS,
+        )
+
+
+class CachedListMixin():
+    """Кеширует отрендеренные JSON-ответы на list.
+
+    Ключ включает путь, нормализованную строку запроса, роль пользователя,
+    принятый медиатип с параметрами и поколения моделей из
+    cache_dependencies: любое изменение этих моделей делает
+    закешированные ответы недоступными. Время жизни
+    задаётся в settings.API_RESPONSE_CACHE_TIMEOUTS по имени вьюсета.
+    """
+    cache_dependencies = ()
+    cached_formats = ('json',)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def get_cache_timeout(self):
+        return settings.API_RESPONSE_CACHE_TIMEOUTS.get(
+            type(self).__name__, settings.API_RESPONSE_CACHE_TIMEOUT
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        timeout = self.get_cache_timeout()
+        if not timeout or request.accepted_renderer.format not in (
+            self.cached_formats
+        ):
+            return handler(request, *args, **kwargs)
+        key = make_key(
+            'response',
+            request.path,
+            normalized_query(request, ignored=()),
+            get_role(request.user),
+            # Параметры медиатипа выбирают режим пагинации
+            # (application/json; pagination=cursor).
+            request.accepted_media_type,
+            get_generations(
+                self.cache_dependencies or (self.get_queryset().model,)
+            ),
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            count_event('hits')
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Cache'] = 'HIT'
+            return response
+        count_event('misses')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            def store(rendered):
+                cache.set(
+                    key, (rendered.content, rendered['Content-Type']), timeout
+                )
+            response.add_post_render_callback(store)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class CachedResponseMixin(CachedListMixin):
+    """Кеширует отрендеренные JSON-ответы на list и retrieve."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class PreconditionResponse(Exception):
+    """Готовый ответ 304 или 412 на запрос с условием."""
+
+    def __init__(self, response):
+        super().__init__(response.status_code)
+        self.response = response
+
+
+class ConditionalRequestMixin():
+    """Условные запросы: ETag, Last-Modified, If-Match.
+
+    Версия списка вычисляется по поколениям моделей из
+    cache_dependencies без обращения к базе и сериализации. Версия
+    объекта - только по выводимым значениям version_fields (пути через
+    точку к уже подгруженным связям), поэтому она одинакова во всех
+    процессах и не меняется от изменения других объектов; без
+    version_fields берётся версия списка.
+    На GET с актуальными If-None-Match/If-Modified-Since возвращается
+    304, на PATCH/DELETE с устаревшим If-Match - 412. Условия
+    проверяются после аутентификации и проверки прав (для объекта -
+    вместе с check_object_permissions), поэтому запрос без прав
+    получает 401/403/404 и не узнаёт, менялся ли ресурс.
+    """
+    object_actions = ('retrieve', 'update', 'partial_update', 'destroy')
+    version_fields = None
+
+    def get_resource_version(self, obj=None):
+        if not hasattr(self, '_resource_version'):
+            if obj is not None and self.version_fields is not None:
+                self._resource_version = get_object_version(
+                    obj, self.version_fields
+                ), None
+            else:
+                models = getattr(self, 'cache_dependencies', None) or (
+                    self.get_queryset().model,
+                )
+                self._resource_version = get_resource_version(
+                    self.request, models
+                )
+        return self._resource_version
+
+    def check_preconditions(self, obj=None):
+        etag, last_modified = self.get_resource_version(obj)
+        response = get_conditional_response(
+            self.request,
+            etag=etag,
+            last_modified=(
+                last_modified and timegm(last_modified.utctimetuple())
+            ),
+        )
+        if response is not None:
+            raise PreconditionResponse(response)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.object_actions:
+            # Объект загружается до кеша ответов: get_object проверяет
+            # права на него и условия запроса.
+            self.get_object()
+        else:
+            self.check_preconditions()
+
+    def get_object(self):
+        if not hasattr(self, '_object'):
+            self._object = super().get_object()
+        return self._object
+
+    def check_object_permissions(self, request, obj):
+        super().check_object_permissions(request, obj)
+        self.check_preconditions(obj)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, PreconditionResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if (
+            request.method in ('GET', 'HEAD')
+            and response.status_code == status.HTTP_200_OK
+        ):
+            etag, last_modified = self.get_resource_version()
+            if etag:
+                response.setdefault('ETag', etag)
+            if last_modified:
+                response.setdefault(
+                    'Last-Modified',
+                    http_date(timegm(last_modified.utctimetuple())),
+                )
+        return response
+
+
+class SerializerTimingMixin:
+    """Учитывает время сериализации ответа в метриках запроса.
+
+    Время замеряется только у корневого сериализатора (или у элементов
+    корневого списка), вложенные сериализаторы в него уже входят.
+    """
+
+    def to_representation(self, instance):
+        parent = self.parent
+        if isinstance(parent, ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return super().to_representation(instance)
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            add_serializer_time(
+                self.context.get('request'), time.perf_counter() - started
+            )
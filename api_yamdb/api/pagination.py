@@ -0,0 +1,229 @@
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (CursorPagination, LimitOffsetPagination,
+                                       _reverse_ordering)
+
+from .cache import get_generations, make_key, normalized_query
+from .metrics import set_page_stats
+
+CURSOR_MODE = 'cursor'
+OFFSET_MODE = 'offset'
+
+
+class KeysetPagination(CursorPagination):
+    """Keyset-пагинация по полям, указанным в cursor_ordering вьюсета.
+
+    CursorPagination из DRF сравнивает позицию только по первому полю
+    сортировки и пропускает совпадающие значения через OFFSET. Здесь
+    позиция - значения всех полей cursor_ordering (JSON-список в
+    курсоре), а страница отбирается сравнением кортежей, например
+    (pub_date, id) < (:pub_date, :id). Последнее поле сортировки должно
+    быть уникальным, тогда позиции не повторяются и OFFSET всегда 0.
+    """
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        return view.cursor_ordering
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field_name = order.lstrip('-')
+            if isinstance(instance, dict):
+                values.append(str(instance[field_name]))
+            else:
+                values.append(str(getattr(instance, field_name)))
+        return json.dumps(values)
+
+    def decode_position(self, position):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def filter_position(self, queryset, position):
+        """Объекты строго после позиции в направлении обхода.
+
+        (a, b) > (x, y) раскрывается в a > x OR (a = x AND b > y):
+        сравнение кортежей в SQLite и PostgreSQL не учитывает, что
+        поля могут сортироваться в разные стороны.
+        """
+        values = self.decode_position(position)
+        condition = Q()
+        equal = {}
+        for order, value in zip(self.ordering, values):
+            field_name = order.lstrip('-')
+            # (курсор назад) XOR (сортировка по убыванию)
+            descending = self.cursor.reverse != order.startswith('-')
+            lookup = 'lt' if descending else 'gt'
+            condition |= Q(**equal, **{f'{field_name}__{lookup}': value})
+            equal[field_name] = value
+        try:
+            return queryset.filter(condition)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Повторяет CursorPagination.paginate_queryset из DRF 3.12,
+        # кроме отбора по позиции.
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = self.filter_position(queryset, current_position)
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class MeteredPagination(LimitOffsetPagination):
+    """LimitOffsetPagination, учитывающая размер страниц в метриках."""
+    mode = OFFSET_MODE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.paginate(queryset, request, view)
+        if page is not None:
+            set_page_stats(request, self.mode, len(page))
+        return page
+
+    def paginate(self, queryset, request, view=None):
+        return super().paginate_queryset(queryset, request, view)
+
+
+class SwitchablePagination(MeteredPagination):
+    """LimitOffsetPagination с переключением на keyset-пагинацию.
+
+    Курсорный режим включается параметром ?pagination=cursor, наличием
+    параметра cursor или параметром медиатипа в заголовке Accept
+    (application/json; pagination=cursor). Без них ответ остаётся прежним.
+    """
+    mode_query_param = 'pagination'
+    cursor_pagination_class = KeysetPagination
+
+    def use_cursor(self, request):
+        if request.query_params.get(self.mode_query_param) == CURSOR_MODE:
+            return True
+        if KeysetPagination.cursor_query_param in request.query_params:
+            return True
+        params = (request.accepted_media_type or '').split(';')[1:]
+        return any(
+            param.strip() == f'{self.mode_query_param}={CURSOR_MODE}'
+            for param in params
+        )
+
+    def paginate(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        self.mode = OFFSET_MODE
+        if view is not None and self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            self.mode = CURSOR_MODE
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class CachedCountPagination(SwitchablePagination):
+    """Пагинация, которая кеширует COUNT(*) отфильтрованного queryset.
+
+    Ключ строится из пути, параметров фильтрации и поколений моделей из
+    cache_dependencies вьюсета, поэтому изменение любой из них сбрасывает
+    закешированное значение. Если задан порог
+    PAGINATION_APPROXIMATE_COUNT_THRESHOLD, для больших выборок берётся
+    оценка планировщика PostgreSQL вместо точного подсчёта.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.view = view
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset):
+        models = getattr(self.view, 'cache_dependencies', None) or (
+            queryset.model,
+        )
+        key = make_key(
+            'count',
+            self.request.path,
+            normalized_query(self.request),
+            get_generations(models),
+        )
+        count = cache.get(key)
+        if count is None:
+            count = self.estimate_count(queryset)
+            if count is None:
+                count = super().get_count(queryset)
+            cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        return count
+
+    def estimate_count(self, queryset):
+        threshold = settings.PAGINATION_APPROXIMATE_COUNT_THRESHOLD
+        if threshold is None or connection.vendor != 'postgresql':
+            return None
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = plan[0]['Plan']['Plan Rows']
+        return estimate if estimate > threshold else None
@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from .authentication import MetricsTokenAuthentication
+
 
 class AdminOnly(permissions.BasePermission):
     """AdminOnly permission.
@@ -17,7 +19,7 @@ class IsAuthorOrAdminOrModerator(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         return (
-            request.user == obj.author
+            request.user.pk == obj.author_id
             or request.user.is_moderator
             or request.user.is_admin
         )
@@ -30,3 +32,12 @@ class IsAdminOrReadOnly(permissions.BasePermission):
             or request.user.is_authenticated
             and request.user.is_admin
         )
+
+
+class MetricsAccess(permissions.BasePermission):
+    """Метрики доступны по токену сборщика или администратору."""
+
+    def has_permission(self, request, view):
+        return isinstance(
+            request.successful_authenticator, MetricsTokenAuthentication
+        ) or (request.user.is_authenticated and request.user.is_admin)
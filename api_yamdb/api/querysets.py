@@ -0,0 +1,111 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import F, Prefetch, Window
+from django.db.models.expressions import OrderBy, RawSQL
+from django.db.models.functions import RowNumber
+from rest_framework import serializers
+
+
+def _related_model(queryset, source):
+    """Возвращает модель, на которую ссылается поле source, или None."""
+    try:
+        field = queryset.model._meta.get_field(source)
+    except FieldDoesNotExist:
+        return None
+    if not field.is_relation:
+        return None
+    return field.related_model
+
+
+def _columns(serializer):
+    """Список колонок, которые выводит вложенный сериализатор."""
+    if isinstance(serializer, serializers.ModelSerializer):
+        return [
+            field.source for field in serializer.fields.values()
+            if field.source != '*' and '.' not in field.source
+        ]
+    if isinstance(serializer, serializers.SlugRelatedField):
+        return [serializer.slug_field]
+    return []
+
+
+def _concrete_column(queryset, source):
+    """True, если source - обычная колонка таблицы queryset."""
+    try:
+        field = queryset.model._meta.get_field(source)
+    except FieldDoesNotExist:
+        return False
+    return field.concrete and not field.many_to_many
+
+
+def plan_queryset(queryset, serializer_class, project=False):
+    """Добавляет в queryset select_related/prefetch_related.
+
+    Связи берутся из объявленных полей сериализатора: для ForeignKey
+    используется select_related, для ManyToMany - Prefetch, который
+    выбирает только выводимые сериализатором колонки. С project=True
+    и основная таблица, и присоединённые через select_related выбираются
+    только в тех колонках, которые выводит сериализатор.
+    """
+    select, prefetch, columns = [], [], []
+    for field in serializer_class().fields.values():
+        if field.write_only:
+            continue
+        if _concrete_column(queryset, field.source):
+            columns.append(field.source)
+        many = isinstance(
+            field, (serializers.ListSerializer, serializers.ManyRelatedField)
+        )
+        child = getattr(field, 'child', None) or getattr(
+            field, 'child_relation', None
+        ) or field
+        if not isinstance(
+            child, (serializers.ModelSerializer, serializers.RelatedField)
+        ):
+            continue
+        model = _related_model(queryset, field.source)
+        if model is None:
+            continue
+        if many:
+            prefetch.append(Prefetch(
+                field.source,
+                queryset=model.objects.only(*_columns(child)),
+            ))
+        else:
+            select.append(field.source)
+            columns.extend(
+                f'{field.source}__{column}' for column in _columns(child)
+            )
+    if project:
+        queryset = queryset.only(*columns)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+def latest_per_group(queryset, group_field, ordering, limit):
+    """Оставляет в queryset первые limit строк каждой группы group_field.
+
+    Номер строки в группе считает ROW_NUMBER() OVER (PARTITION BY ...)
+    во вложенном запросе: Django 3.2 не фильтрует по оконным
+    аннотациям, поэтому отбор по номеру выполняется в обёртке над ним.
+    Всё вместе - один SQL-запрос независимо от числа групп.
+    """
+    order_by = [
+        OrderBy(F(field.lstrip('-')), descending=field.startswith('-'))
+        for field in ordering
+    ]
+    ranked = queryset.order_by().annotate(
+        row_number=Window(
+            RowNumber(), partition_by=F(group_field), order_by=order_by
+        ),
+    ).values('pk', 'row_number')
+    sql, params = ranked.query.get_compiler(queryset.db).as_sql()
+    quote = connections[queryset.db].ops.quote_name
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT ranked.{quote(queryset.model._meta.pk.column)} '
+        f'FROM ({sql}) ranked WHERE ranked.{quote("row_number")} <= %s',
+        (*params, limit),
+    )).order_by(group_field, *ordering)
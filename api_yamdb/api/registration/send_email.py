@@ -1,6 +1,8 @@
 from django.core.mail import send_mail
 from django.conf import settings
 
+from reviews.models import QueuedEmail
+
 
 CONFIRMATION_CODE_LENGTH = 10
 DEFAULT_SUBJECT = 'Код подтверждения от Yamdb'
@@ -9,6 +11,19 @@ DEFAULT_FROM_EMAIL = settings.ADMIN_EMAIL
 
 
 def send_email(user_email, code):
+    """Отправляет код подтверждения.
+
+    При EMAIL_QUEUE_ENABLED письмо только ставится в очередь, которую
+    разбирает команда send_queued_emails.
+    """
+    if settings.EMAIL_QUEUE_ENABLED:
+        QueuedEmail.objects.create(
+            recipient=user_email,
+            from_email=DEFAULT_FROM_EMAIL,
+            subject=DEFAULT_SUBJECT,
+            message=DEFAULT_MESSAGE.format(code),
+        )
+        return
     send_mail(
         subject=DEFAULT_SUBJECT,
         message=DEFAULT_MESSAGE.format(code),
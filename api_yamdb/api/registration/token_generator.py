@@ -1,4 +1,24 @@
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from api.authentication import (CLAIMS_VERSION_CLAIM, ROLE_CLAIM,
+                                cache_user)
+
+
+class RoleAccessToken(AccessToken):
+    """Access-токен с ролью пользователя в claims."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[ROLE_CLAIM] = user.role
+        token['username'] = user.username
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        token[CLAIMS_VERSION_CLAIM] = user.claims_version
+        # Пользователь только что прочитан из базы: первые запросы
+        # с токеном не повторяют этот запрос.
+        cache_user(user)
+        return token
 
 
 def get_token_for_user(user):
@@ -1,12 +1,14 @@
 from django.conf import settings
+from django.db import models
 from rest_framework import serializers
 from django.contrib.auth.validators import UnicodeUsernameValidator
 
 from reviews.models import Category, Genre, Title, Review, Comment, User
-from .mixins import UsernameValidationMixin
+from .mixins import SerializerTimingMixin, UsernameValidationMixin
 
 
-class UserSerializer(serializers.ModelSerializer, UsernameValidationMixin):
+class UserSerializer(SerializerTimingMixin, serializers.ModelSerializer,
+                     UsernameValidationMixin):
     """Сериализатор модели User."""
 
     class Meta:
@@ -47,21 +49,41 @@ class GetAuthTokenSerializer(serializers.Serializer, UsernameValidationMixin):
     )
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class LowercaseSlugField(serializers.SlugField):
+    """Слаг в нижнем регистре, как он хранится в базе.
+
+    Валидаторы поля, в том числе проверка уникальности, получают уже
+    нормализованное значение: 'Drama' при наличии 'drama' даёт 400.
+    """
+
+    def to_internal_value(self, data):
+        return super().to_internal_value(data).lower()
+
+
+class BaseCategoryGenreSerializer(SerializerTimingMixin,
+                                  serializers.ModelSerializer):
+    """Базовый сериализатор для категорий и жанров"""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.SlugField: LowercaseSlugField,
+    }
+
+
+class CategorySerializer(BaseCategoryGenreSerializer):
     """Сериализатор для категорий"""
     class Meta:
         fields = ('name', 'slug')
         model = Category
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(BaseCategoryGenreSerializer):
     """Сериализатор для жанров"""
     class Meta:
         fields = ('name', 'slug')
         model = Genre
 
 
-class TitleReadSerializer(serializers.ModelSerializer):
+class TitleReadSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     "Сериализатор для GET запроса"
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(
@@ -69,13 +91,27 @@ class TitleReadSerializer(serializers.ModelSerializer):
         many=True
     )
     rating = serializers.IntegerField(read_only=True)
+    reviews_count = serializers.IntegerField(
+        source='rating_count', read_only=True
+    )
 
     class Meta:
-        fields = '__all__'
+        fields = (
+            'id', 'name', 'year', 'rating', 'reviews_count', 'description',
+            'genre', 'category'
+        )
         model = Title
 
 
-class TitleWriteSerializer(serializers.ModelSerializer):
+class TitleStatsSerializer(serializers.Serializer):
+    """Статистика оценок произведения"""
+    count = serializers.IntegerField()
+    mean = serializers.FloatField(allow_null=True)
+    median = serializers.FloatField(allow_null=True)
+    histogram = serializers.DictField(child=serializers.IntegerField())
+
+
+class TitleWriteSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     "Сериализатор для ввода, изменения и удаления данных"
     category = serializers.SlugRelatedField(
         slug_field='slug',
@@ -88,11 +124,11 @@ class TitleWriteSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        fields = '__all__'
+        fields = ('id', 'name', 'year', 'description', 'genre', 'category')
         model = Title
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     """Сериализатор для отзывов"""
     author = serializers.SlugRelatedField(
         read_only=True,
@@ -101,10 +137,12 @@ class ReviewSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Review
-        fields = ['id', 'text', 'author', 'score', 'pub_date']
+        fields = [
+            'id', 'text', 'author', 'score', 'pub_date', 'comments_count'
+        ]
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SerializerTimingMixin, serializers.ModelSerializer):
     """Сериализатор для комментариев"""
     author = serializers.SlugRelatedField(
         read_only=True,
@@ -114,3 +152,15 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ['id', 'text', 'author', 'pub_date']
+
+
+class ReviewWithCommentsSerializer(ReviewSerializer):
+    """Сериализатор для отзывов с последними комментариями"""
+    comments = CommentSerializer(
+        many=True,
+        read_only=True,
+        source='latest_comments'
+    )
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ReviewSerializer.Meta.fields + ['comments']
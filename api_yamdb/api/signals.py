@@ -0,0 +1,59 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+from .authentication import revoke_user_claims
+from .cache import bump_generation
+
+TRACKED_MODELS = (Category, Genre, Title, Review, Comment)
+
+
+def invalidate(model):
+    # Поколение меняется после фиксации транзакции: иначе параллельный
+    # запрос успел бы закешировать старые данные под новым поколением.
+    transaction.on_commit(partial(bump_generation, model))
+
+
+def model_changed(sender, **kwargs):
+    invalidate(sender)
+
+
+def comment_counted(sender, created=True, **kwargs):
+    """Счётчик comments_count меняется через update() без сигналов Review."""
+    if created:
+        invalidate(Review)
+
+
+def user_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(revoke_user_claims, instance.pk))
+
+
+def user_renamed(sender, instance, created, **kwargs):
+    """Сбрасывает закешированные ответы, в которых выводится автор."""
+    if not created and instance.username != getattr(
+        instance, '_loaded_username', None
+    ):
+        invalidate(User)
+    instance._loaded_username = instance.username
+
+
+def title_genres_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate(Title)
+
+
+for model in TRACKED_MODELS:
+    post_save.connect(
+        model_changed, sender=model, dispatch_uid=f'api_saved_{model}'
+    )
+    post_delete.connect(
+        model_changed, sender=model, dispatch_uid=f'api_deleted_{model}'
+    )
+post_save.connect(comment_counted, sender=Comment)
+post_delete.connect(comment_counted, sender=Comment)
+m2m_changed.connect(title_genres_changed, sender=Title.genre.through)
+post_save.connect(user_changed, sender=User)
+post_save.connect(user_renamed, sender=User)
+post_delete.connect(user_changed, sender=User)
@@ -10,7 +10,8 @@ from .views import (
     CommentViewSet,
     CreateUserView,
     UserViewSet,
-    GetAuthTokenView
+    GetAuthTokenView,
+    metrics
 )
 
 VERSION_1 = 'v1/'
@@ -35,4 +36,5 @@ router_v1.register(
 urlpatterns = [
     path(VERSION_1, include(router_v1.urls)),
     path(VERSION_1, include(auth_urls)),
+    path('metrics', metrics, name='metrics'),
 ]
@@ -1,3 +1,6 @@
+from django.conf import settings
+from django.db.models import F
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.tokens import default_token_generator
 from rest_framework.views import APIView
@@ -6,25 +9,29 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.filters import SearchFilter
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.decorators import action
+from rest_framework.decorators import (action, api_view,
+                                       authentication_classes,
+                                       permission_classes)
+from rest_framework.settings import api_settings
 from rest_framework.generics import CreateAPIView
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from rest_framework.validators import ValidationError
 from rest_framework import viewsets, response
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
-from django.db.models import Avg
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework import mixins
 
-from reviews.models import Category, Genre, Title, Review, Comment
+from reviews.models import (Category, Genre, Title, Review, Comment,
+                            ScoreBucket)
+from reviews.ratings import score_statistics
 from .serializers import (
     CategorySerializer,
     GenreSerializer,
     TitleReadSerializer,
+    TitleStatsSerializer,
     TitleWriteSerializer,
     ReviewSerializer,
+    ReviewWithCommentsSerializer,
     CommentSerializer
 )
 from .serializers import (UserSerializer, GetAuthTokenSerializer,
@@ -32,16 +39,38 @@ from .serializers import (UserSerializer, GetAuthTokenSerializer,
 from .permissions import (
     IsAuthorOrAdminOrModerator,
     AdminOnly,
-    IsAdminOrReadOnly
+    IsAdminOrReadOnly,
+    MetricsAccess
 )
 from reviews.models import User
+from .authentication import MetricsTokenAuthentication, get_full_user
 from .registration.send_email import send_email
-from .filters import TitleFilter
+from .registration.token_generator import RoleAccessToken
+from .filters import FullTextSearchFilter, TitleFilter
+from .metrics import registry
+from .mixins import (CachedListMixin, CachedResponseMixin,
+                     ConditionalRequestMixin, NestedRouteMixin,
+                     PlannedQuerysetMixin)
+from .pagination import CachedCountPagination, MeteredPagination
+from .querysets import latest_per_group, plan_queryset
 
 
 ERROR_SIGNUP_USERNAME_OR_MAIL = (
     'Пользователь с таким email или username уже существует'
 )
+ERROR_REVIEW_EXISTS = 'Вы уже оставляли отзыв на это произведение'
+ERROR_COMMENTS_LIMIT = 'Ожидается целое число от 1 до {max_limit}.'
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@api_view(['GET'])
+@authentication_classes(
+    [MetricsTokenAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+)
+@permission_classes([MetricsAccess])
+def metrics(request):
+    """Метрики API в текстовом формате Prometheus."""
+    return HttpResponse(registry.render(), content_type=METRICS_CONTENT_TYPE)
 
 
 class CreateUserView(CreateAPIView):
@@ -53,15 +82,19 @@ class CreateUserView(CreateAPIView):
         serializer.is_valid(raise_exception=True)
         username = serializer.validated_data.get('username')
         email = serializer.validated_data.get('email')
+        # Новый пользователь создаётся одним INSERT; повторная регистрация
+        # упирается в уникальные индексы username/email и проверяется
+        # одним SELECT по ним.
         try:
-            user, created = User.objects.get_or_create(
-                username=username,
-                email=email
-            )
+            with transaction.atomic():
+                user = User.objects.create(username=username, email=email)
         except IntegrityError:
-            raise ValidationError(ERROR_SIGNUP_USERNAME_OR_MAIL)
+            user = User.objects.filter(
+                username=username, email=email
+            ).first()
+            if user is None:
+                raise ValidationError(ERROR_SIGNUP_USERNAME_OR_MAIL)
         confirmation_code = default_token_generator.make_token(user)
-        user.save()
         send_email(user.email, confirmation_code)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -76,7 +109,7 @@ class GetAuthTokenView(APIView):
         confirmation_code = serializer.validated_data.get("confirmation_code")
         user = get_object_or_404(User, username=username)
         if default_token_generator.check_token(user, confirmation_code):
-            token = AccessToken.for_user(user)
+            token = RoleAccessToken.for_user(user)
             return response.Response(
                 {'token': str(token)}, status=status.HTTP_200_OK
             )
@@ -104,7 +137,7 @@ class UserViewSet(ModelViewSet):
     )
     def me(self, request):
         serializer = UserSerializer(
-            request.user, partial=True, data=request.data
+            get_full_user(request.user), partial=True, data=request.data
         )
         serializer.is_valid(raise_exception=True)
         if request.method == "PATCH":
@@ -126,12 +159,14 @@ class BaseViewSet(viewsets.ModelViewSet):
 
 
 class BaseCategoryGenreViewSet(
+    ConditionalRequestMixin,
+    CachedListMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
     viewsets.GenericViewSet
 ):
-    pagination_class = LimitOffsetPagination
+    pagination_class = MeteredPagination
     filter_backends = (SearchFilter,)
     search_fields = ('name', )
     lookup_field = 'slug'
@@ -142,7 +177,7 @@ class CategoryViewSet(BaseCategoryGenreViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]
-    pagination_class = LimitOffsetPagination
+    pagination_class = MeteredPagination
 
 
 class GenreViewSet(BaseCategoryGenreViewSet):
@@ -150,59 +185,188 @@ class GenreViewSet(BaseCategoryGenreViewSet):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = [IsAdminOrReadOnly]
-    pagination_class = LimitOffsetPagination
+    pagination_class = MeteredPagination
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(
+    ConditionalRequestMixin,
+    CachedResponseMixin,
+    PlannedQuerysetMixin,
+    viewsets.ModelViewSet
+):
     """ViewSet для произведений."""
-    queryset = Title.objects.annotate(
-        rating=Avg('reviews__score')
-    )
+    queryset = Title.objects.all()
     permission_classes = [IsAdminOrReadOnly]
-    pagination_class = LimitOffsetPagination
-    filter_backends = [DjangoFilterBackend]
+    pagination_class = CachedCountPagination
+    cursor_ordering = ('id',)
+    cache_dependencies = (Title, Category, Genre, Review)
+    # Запись подгружает у жанров только slug, поэтому их названия в
+    # ETag не входят.
+    version_fields = (
+        'name', 'year', 'rating', 'rating_count', 'description',
+        'genre.slug', 'category.slug', 'category.name',
+    )
+    filter_backends = [FullTextSearchFilter, DjangoFilterBackend]
     filterset_class = TitleFilter
 
     def get_serializer_class(self):
+        if self.action == 'stats':
+            return TitleStatsSerializer
         if self.request.method == 'GET':
             return TitleReadSerializer
         return TitleWriteSerializer
 
+    @transaction.atomic
+    def perform_create(self, serializer):
+        # Произведение, его жанры и корзины оценок создаются вместе.
+        super().perform_create(serializer)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+
+    @action(detail=True, methods=('get',))
+    def stats(self, request, pk=None):
+        """Распределение оценок 1-10, их количество, среднее и медиана."""
+        return self.cached_response(self.get_stats, request, pk=pk)
+
+    def get_stats(self, request, pk=None):
+        # Статистика считается по десяти счётчикам ScoreBucket,
+        # а не по отзывам произведения.
+        title = get_object_or_404(Title.objects.only('id'), pk=pk)
+        buckets = ScoreBucket.objects.filter(title=title).values_list(
+            'score', 'count'
+        )
+        serializer = self.get_serializer(score_statistics(buckets))
+        return Response(serializer.data)
 
-class ReviewViewSet(BaseViewSet):
+
+class ReviewViewSet(
+    ConditionalRequestMixin,
+    CachedResponseMixin,
+    NestedRouteMixin,
+    PlannedQuerysetMixin,
+    BaseViewSet
+):
     """ViewSet для отзывов."""
+    queryset = Review.objects.all()
+    parent_model = Title
+    parent_lookups = {'pk': 'title_id'}
+    route_lookups = {'title_id': 'title_id'}
     serializer_class = ReviewSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = CachedCountPagination
+    cursor_ordering = ('-pub_date', '-id')
+    # Автор выводится по username, поэтому от User зависят и отзывы;
+    # удаление произведения должно давать 404, а не закешированный список.
+    cache_dependencies = (Review, Comment, User, Title)
+    version_fields = (
+        'text', 'author.username', 'score', 'pub_date', 'comments_count'
+    )
     permission_classes = [IsAuthenticatedOrReadOnly]
+    filter_backends = [FullTextSearchFilter]
+    embed_query_param = 'embed'
+    comments_limit_query_param = 'comments_limit'
+
+    def embeds_comments(self):
+        """True, если список запрошен с ?embed=comments."""
+        embed = self.request.query_params.get(self.embed_query_param, '')
+        return self.action == 'list' and 'comments' in embed.split(',')
+
+    def get_comments_limit(self):
+        value = self.request.query_params.get(
+            self.comments_limit_query_param
+        )
+        if value is None:
+            return settings.EMBEDDED_COMMENTS_LIMIT
+        max_limit = settings.EMBEDDED_COMMENTS_MAX_LIMIT
+        if not value.isdigit() or not 1 <= int(value) <= max_limit:
+            raise ValidationError({
+                self.comments_limit_query_param: ERROR_COMMENTS_LIMIT.format(
+                    max_limit=max_limit
+                )
+            })
+        return int(value)
 
-    def get_title_id(self):
-        return self.kwargs.get('title_id')
-
-    def get_queryset(self):
-        return Review.objects.filter(title_id=self.get_title_id())
+    def get_serializer_class(self):
+        if self.embeds_comments():
+            return ReviewWithCommentsSerializer
+        return super().get_serializer_class()
+
+    def paginate_queryset(self, queryset):
+        if not self.embeds_comments():
+            return super().paginate_queryset(queryset)
+        limit = self.get_comments_limit()
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.attach_latest_comments(page, limit)
+        return page
+
+    def attach_latest_comments(self, reviews, limit):
+        """Последние limit комментариев каждого отзыва одним запросом."""
+        for review in reviews:
+            review.latest_comments = []
+        if not reviews:
+            return
+        comments = plan_queryset(
+            Comment.objects.filter(
+                review_id__in=[review.pk for review in reviews]
+            ),
+            CommentSerializer,
+            project=True,
+        ).annotate(embedded_review_id=F('review_id'))
+        by_id = {review.pk: review for review in reviews}
+        for comment in latest_per_group(
+            comments, 'review_id', ('-pub_date', '-id'), limit
+        ):
+            by_id[comment.embedded_review_id].latest_comments.append(comment)
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, id=self.get_title_id())
+        # Дубликат отзыва отсекает ограничение unique_review, а
+        # существование произведения - UPDATE его рейтинга в сигнале
+        # review_saved, поэтому на успешном пути отзыв сохраняется без
+        # предварительных SELECT.
+        try:
+            with transaction.atomic():
+                serializer.save(
+                    author=get_full_user(self.request.user),
+                    title_id=self.kwargs['title_id'],
+                )
+        except Title.DoesNotExist:
+            raise Http404
+        except IntegrityError:
+            self.get_parent()
+            raise ValidationError(ERROR_REVIEW_EXISTS)
 
-        if Review.objects.filter(author=self.request.user,
-                                 title=title).exists():
-            raise ValidationError("Вы уже оставляли отзыв на это произведение")
+    @transaction.atomic
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
 
-        serializer.save(author=self.request.user, title=title)
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
 
 
-class CommentViewSet(BaseViewSet):
+class CommentViewSet(
+    ConditionalRequestMixin,
+    CachedResponseMixin,
+    NestedRouteMixin,
+    PlannedQuerysetMixin,
+    BaseViewSet
+):
     """ViewSet для комментариев."""
+    queryset = Comment.objects.all()
+    parent_model = Review
+    parent_lookups = {'pk': 'review_id', 'title_id': 'title_id'}
+    route_lookups = {'review_id': 'review_id', 'review__title_id': 'title_id'}
     serializer_class = CommentSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = CachedCountPagination
+    cursor_ordering = ('-pub_date', '-id')
+    cache_dependencies = (Comment, User, Review, Title)
+    version_fields = ('text', 'author.username', 'pub_date')
     permission_classes = [IsAuthenticatedOrReadOnly]
-
-    def get_review_id(self):
-        return self.kwargs.get('review_id')
-
-    def get_queryset(self):
-        return Comment.objects.filter(review_id=self.get_review_id())
+    filter_backends = [FullTextSearchFilter]
 
     def perform_create(self, serializer):
-        review = get_object_or_404(Review, id=self.get_review_id())
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(
+            author=get_full_user(self.request.user), review=self.get_parent()
+        )
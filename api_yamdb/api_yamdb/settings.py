@@ -31,6 +31,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,6 +70,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Файловая тестовая база: в in-memory SQLite с общим кешем
+        # параллельные запросы падают с "database table is locked"
+        # вместо ожидания блокировки.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -96,15 +102,77 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 ADMIN_EMAIL = "from@example.com"
+# Отправлять коды подтверждения через очередь (команда send_queued_emails)
+# вместо отправки прямо в запросе на регистрацию.
+EMAIL_QUEUE_ENABLED = False
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
+# Задержка перед первой повторной попыткой, секунд; дальше удваивается.
+EMAIL_QUEUE_RETRY_DELAY = 60
+# Сколько секунд письмо закреплено за отправляющим процессом; если он
+# упал, письмо снова попадает в очередь по истечении этого срока.
+EMAIL_QUEUE_LEASE = 300
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.MeteredPagination',
     'PAGE_SIZE': 10,
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Время жизни закешированного COUNT(*) для пагинации, в секундах.
+PAGINATION_COUNT_CACHE_TIMEOUT = 60 * 5
+# Начиная с этой оценки числа строк, пагинация отдаёт приблизительный
+# count (только PostgreSQL). None - всегда точный подсчёт.
+PAGINATION_APPROXIMATE_COUNT_THRESHOLD = None
+
+# Время жизни закешированных ответов API в секундах: по умолчанию и для
+# отдельных вьюсетов. 0 отключает кеширование ответов.
+API_RESPONSE_CACHE_TIMEOUT = 60
+API_RESPONSE_CACHE_TIMEOUTS = {
+    'CategoryViewSet': 60 * 15,
+    'GenreViewSet': 60 * 15,
+    'TitleViewSet': 60 * 5,
+}
+
+# Сколько секунд кешируется пользователь, по версии claims которого
+# проверяются claims токена. С кешем в памяти процесса это и наибольшая
+# задержка, с которой смена роли доходит до других процессов.
+JWT_USER_CACHE_TIMEOUT = 60
+
+# Бюджеты SQL-запросов на один HTTP-запрос по именам вьюсетов
+# (см. api.middleware.QueryBudgetMiddleware).
+QUERY_BUDGET_DEFAULT = 20
+QUERY_BUDGETS = {
+    'CategoryViewSet': 5,
+    'GenreViewSet': 5,
+    # Создание произведения заводит десять корзин оценок одним INSERT.
+    'TitleViewSet': 11,
+    # Изменение отзыва перечитывает оценку под блокировкой строки.
+    'ReviewViewSet': 9,
+    'CommentViewSet': 8,
+}
+# Сколько последних комментариев выводится у отзыва при
+# ?embed=comments по умолчанию и наибольшее значение comments_limit.
+EMBEDDED_COMMENTS_LIMIT = 3
+EMBEDDED_COMMENTS_MAX_LIMIT = 20
+# Сколько одинаковых по форме запросов считается сигнатурой N+1.
+QUERY_REPEAT_THRESHOLD = 5
+# Исключение вместо предупреждения в логе при превышении бюджета.
+QUERY_BUDGET_RAISE = False
+# Заголовки X-Query-Count и X-Query-Time в ответах без DEBUG, например
+# для benchmark_api на стенде.
+QUERY_STATS_HEADERS = False
+# Bearer-токен, с которым сборщик метрик читает /api/metrics; без него
+# метрики доступны только администраторам.
+METRICS_TOKEN = None
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=999),
     "AUTH_HEADER_TYPES": ("Bearer",),
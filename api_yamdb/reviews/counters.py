@@ -0,0 +1,33 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def update_comments_count(reviews, delta):
+    """Атомарно сдвигает счётчик комментариев отзывов."""
+    reviews.update(comments_count=F('comments_count') + delta)
+
+
+def _comments_count(comment_model):
+    return Coalesce(
+        Subquery(
+            comment_model.objects.filter(review=OuterRef('pk'))
+            .order_by()
+            .values('review')
+            .annotate(value=Count('id'))
+            .values('value'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def find_comments_count_drift(reviews, comment_model):
+    """Отзывы, у которых счётчик расходится с комментариями."""
+    return reviews.annotate(
+        actual_comments_count=_comments_count(comment_model)
+    ).exclude(comments_count=F('actual_comments_count'))
+
+
+def rebuild_comments_count(reviews, comment_model):
+    """Пересчитывает счётчик комментариев отзывов одним UPDATE."""
+    return reviews.update(comments_count=_comments_count(comment_model))
@@ -1,18 +1,32 @@
 import csv
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
 from django.db.utils import IntegrityError
 
+from reviews.counters import rebuild_comments_count
+from reviews.ratings import rebuild_ratings, rebuild_score_buckets
+from reviews.search import rebuild_search_index
 from reviews.models import (
     User,
     Category,
     Genre,
     Title,
     Review,
-    Comment
+    Comment,
+    ScoreBucket,
 )
 
 FILE_PATH = 'static/data/'
+DEFAULT_BATCH_SIZE = 1000
+MODE_INSERT = 'insert'
+MODE_UPSERT = 'upsert'
+MODE_SKIP_EXISTING = 'skip-existing'
+MODES = (MODE_INSERT, MODE_UPSERT, MODE_SKIP_EXISTING)
 
 data_to_load_csv = {
     'users': [
@@ -84,22 +98,131 @@ data_to_load_csv = {
 }
 
 
+def read_objects(file, model, fields):
+    """Лениво превращает строки CSV в объекты модели."""
+    reader = csv.reader(file)
+    next(reader)
+    for row in reader:
+        yield model(**dict(zip(fields, row)))
+
+
+def batches(iterable, size):
+    """Разбивает итератор на списки не длиннее size."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_batch(model, batch, fields, mode):
+    """Записывает пачку объектов и возвращает счётчик по типам записи.
+
+    В режиме insert существующий id вызывает IntegrityError. В режимах
+    upsert и skip-existing существующие id определяются одним запросом
+    на пачку, после чего новые строки вставляются через bulk_create, а
+    существующие обновляются через bulk_update или пропускаются.
+    """
+    if mode == MODE_INSERT:
+        model.objects.bulk_create(batch)
+        return Counter(inserted=len(batch))
+    pk_field = model._meta.pk
+    for obj in batch:
+        obj.pk = pk_field.to_python(obj.pk)
+    existing = set(
+        model.objects.filter(
+            pk__in=[obj.pk for obj in batch]
+        ).values_list('pk', flat=True)
+    )
+    new = [obj for obj in batch if obj.pk not in existing]
+    old = [obj for obj in batch if obj.pk in existing]
+    # id уже разделены запросом выше; конфликт по другим уникальным
+    # полям (slug, username, unique_review) должен прервать загрузку,
+    # а не молча отбросить строку.
+    model.objects.bulk_create(new)
+    if mode == MODE_SKIP_EXISTING:
+        return Counter(inserted=len(new), skipped=len(old))
+    update_fields = [
+        model._meta.get_field(field).name for field in fields
+        if field != pk_field.attname
+    ]
+    if old and update_fields:
+        model.objects.bulk_update(old, update_fields)
+    return Counter(inserted=len(new), updated=len(old))
+
+
+def get_dependencies(csv_name):
+    """Файлы, на строки которых ссылаются внешние ключи файла csv_name."""
+    model, fields = data_to_load_csv[csv_name]
+    related_models = {
+        field.related_model for field in model._meta.concrete_fields
+        if field.many_to_one and field.attname in fields
+        and field.related_model is not model
+    }
+    return {
+        name for name, (other, _) in data_to_load_csv.items()
+        if other in related_models
+    }
+
+
+def get_load_waves(csv_names):
+    """Раскладывает файлы по волнам в порядке зависимостей.
+
+    Файлы одной волны не ссылаются друг на друга и могут загружаться
+    параллельно. Зависимости от файлов, не указанных для загрузки,
+    не учитываются.
+    """
+    pending = {
+        name: get_dependencies(name) & set(csv_names) for name in csv_names
+    }
+    waves = []
+    while pending:
+        wave = sorted(name for name, deps in pending.items() if not deps)
+        if not wave:
+            raise ValueError(
+                f'Циклическая зависимость между файлами: {sorted(pending)}'
+            )
+        waves.append(wave)
+        for name in wave:
+            del pending[name]
+        for deps in pending.values():
+            deps.difference_update(wave)
+    return waves
+
+
 class Command(BaseCommand):
     help = '''Импортирует данные из CSV файлов в базу данных.
         Без указания файла импортирует все.'''
 
-    def csv_load(self, file_name, model, fields):
+    def csv_load(self, file_name, model, fields, batch_size, mode):
+        """Загружает файл пачками по batch_size строк.
+
+        В памяти одновременно находится не больше одной пачки, каждая
+        пачка записывается в своей транзакции.
+        """
+        loaded = 0
+        summary = Counter()
+        started = time.monotonic()
         try:
             with open(f'{FILE_PATH}{file_name}.csv', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                next(reader)
-                objects = [
-                    model(**dict(zip(fields, row)))
-                    for row in reader
-                ]
-                model.objects.bulk_create(objects)
+                for batch in batches(
+                    read_objects(file, model, fields), batch_size
+                ):
+                    with transaction.atomic():
+                        summary += write_batch(model, batch, fields, mode)
+                    loaded += len(batch)
+                    if self.verbosity > 1:
+                        self.stdout.write(
+                            f'{file_name}: загружено {loaded} строк, '
+                            f'{self.rate(loaded, started):.0f} строк/с'
+                        )
             self.stdout.write(self.style.SUCCESS(
-                f'Данные из файла {file_name} загружены в базу данных.')
+                f'Данные из файла {file_name} загружены в базу данных: '
+                f'{loaded} строк, {self.rate(loaded, started):.0f} строк/с '
+                f'(добавлено {summary["inserted"]}, '
+                f'обновлено {summary["updated"]}, '
+                f'пропущено {summary["skipped"]}).')
             )
         except IntegrityError as error:
             msg = f'Ошибка при записи данных из {file_name}.csv:{error}'
@@ -113,6 +236,10 @@ class Command(BaseCommand):
             msg = f'Ошибка при декодировании данных из {file_name}.csv:{error}'
             raise FileNotFoundError(self.style.ERROR(msg))
 
+    @staticmethod
+    def rate(rows, started):
+        return rows / max(time.monotonic() - started, 1e-9)
+
     def add_arguments(self, parser):
         parser.add_argument(
             'csv_names',
@@ -120,11 +247,82 @@ class Command(BaseCommand):
             type=str,
             nargs='*',
             help='''Названия CSV файлов, можно указать несколько.
-                При указании файла следует следить,
-                чтобы данные ссылались на существующий объект'''
+                Файлы загружаются в порядке зависимостей, но данные
+                должны ссылаться на существующие объекты'''
+        )
+        parser.add_argument(
+            '--batch-size',
+            default=DEFAULT_BATCH_SIZE,
+            type=int,
+            help='Количество строк, записываемых в базу за одну транзакцию.'
+        )
+        parser.add_argument(
+            '--mode',
+            default=MODE_INSERT,
+            choices=MODES,
+            help='''Что делать со строками, id которых уже есть в базе:
+                insert - ошибка, upsert - обновить, skip-existing - пропустить.
+                '''
         )
+        parser.add_argument(
+            '--jobs',
+            default=1,
+            type=int,
+            help='''Сколько независимых файлов загружать параллельно.
+                Порядок файлов определяется по внешним ключам моделей.
+                На SQLite файлы всегда загружаются последовательно.'''
+        )
+
+    def load_in_thread(self, *args):
+        try:
+            self.csv_load(*args)
+        finally:
+            connection.close()
+
+    def get_jobs(self, jobs):
+        if jobs < 1:
+            raise CommandError('--jobs должно быть не меньше 1.')
+        if jobs > 1 and connection.vendor == 'sqlite':
+            # SQLite допускает одного писателя, параллельные транзакции
+            # падают с "database is locked".
+            self.stderr.write(
+                'SQLite не поддерживает параллельную запись, '
+                'файлы загружаются последовательно.'
+            )
+            return 1
+        return jobs
 
     def handle(self, *args, **options):
-        for csv_name in options['csv_names']:
-            data = data_to_load_csv[csv_name]
-            self.csv_load(csv_name, *data)
+        self.verbosity = options['verbosity']
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должно быть не меньше 1.')
+        jobs = self.get_jobs(options['jobs'])
+        for wave in get_load_waves(list(options['csv_names'])):
+            loads = [
+                (csv_name, *data_to_load_csv[csv_name],
+                 options['batch_size'], options['mode'])
+                for csv_name in wave
+            ]
+            if jobs == 1 or len(loads) == 1:
+                for load in loads:
+                    self.csv_load(*load)
+                continue
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                futures = [
+                    executor.submit(self.load_in_thread, *load)
+                    for load in loads
+                ]
+                for future in futures:
+                    future.result()
+        if 'review' in options['csv_names']:
+            rebuild_ratings(Title.objects.all(), Review)
+        if {'titles', 'review'} & set(options['csv_names']):
+            with transaction.atomic():
+                rebuild_score_buckets(ScoreBucket, Review)
+        if 'comments' in options['csv_names']:
+            rebuild_comments_count(Review.objects.all(), Comment)
+        searchable = {'titles': Title, 'review': Review, 'comments': Comment}
+        if searchable.keys() & set(options['csv_names']):
+            # bulk_create не отправляет сигналы, индекс строится заново.
+            with transaction.atomic():
+                rebuild_search_index(connection, searchable.values())
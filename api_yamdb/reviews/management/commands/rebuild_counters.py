@@ -0,0 +1,76 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+
+from reviews.counters import find_comments_count_drift, rebuild_comments_count
+from reviews.models import Comment, Review, Title
+from reviews.ratings import find_rating_drift, rebuild_ratings
+
+DEFAULT_BATCH_SIZE = 10000
+COUNTERS = (
+    # Количество отзывов произведения хранится в rating_count.
+    (Title, Review, find_rating_drift, rebuild_ratings),
+    (Review, Comment, find_comments_count_drift, rebuild_comments_count),
+)
+
+
+class Command(BaseCommand):
+    help = '''Сверяет счётчики отзывов и комментариев с данными и
+        исправляет расхождения. Строки проверяются диапазонами id по
+        --batch-size, пересчитываются только разошедшиеся.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить счётчики, не изменяя данные.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            default=DEFAULT_BATCH_SIZE,
+            type=int,
+            help='Количество id в диапазоне, проверяемом за одну транзакцию.'
+        )
+
+    def repair(self, model, related, find_drift, rebuild, options):
+        """Проходит таблицу пачками; возвращает число расхождений."""
+        bounds = model.objects.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            return 0
+        batch_size = options['batch_size']
+        drift = 0
+        for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+            with transaction.atomic():
+                batch = model.objects.filter(
+                    pk__gte=start, pk__lt=start + batch_size
+                )
+                drifted = list(
+                    find_drift(batch, related).values_list('pk', flat=True)
+                )
+                if drifted and not options['check']:
+                    rebuild(model.objects.filter(pk__in=drifted), related)
+            drift += len(drifted)
+        return drift
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должно быть не меньше 1.')
+        found = {
+            model._meta.verbose_name_plural: self.repair(
+                model, related, find_drift, rebuild, options
+            )
+            for model, related, find_drift, rebuild in COUNTERS
+        }
+        report = ', '.join(
+            f'{name}: {count}' for name, count in found.items()
+        )
+        if options['check']:
+            if any(found.values()):
+                raise CommandError(f'Счётчики расходятся с данными. {report}')
+            self.stdout.write(self.style.SUCCESS(
+                'Счётчики совпадают с данными.')
+            )
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено расхождений счётчиков. {report}')
+        )
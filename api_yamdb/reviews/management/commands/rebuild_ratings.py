@@ -0,0 +1,35 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from reviews.models import Review, Title
+from reviews.ratings import find_rating_drift, rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = '''Пересчитывает сохранённые рейтинги произведений по отзывам.
+        С флагом --check только проверяет расхождения.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить рейтинги, не изменяя данные.'
+        )
+
+    def handle(self, *args, **options):
+        drift = find_rating_drift(Title.objects.all(), Review).count()
+        if options['check']:
+            if drift:
+                raise CommandError(
+                    f'Рейтинг расходится с отзывами у {drift} произведений.'
+                )
+            self.stdout.write(self.style.SUCCESS(
+                'Рейтинги всех произведений совпадают с отзывами.')
+            )
+            return
+        with transaction.atomic():
+            updated = rebuild_ratings(Title.objects.all(), Review)
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинги пересчитаны для {updated} произведений, '
+            f'исправлено расхождений: {drift}.')
+        )
@@ -0,0 +1,44 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from reviews.models import Review, ScoreBucket
+from reviews.ratings import count_scores, rebuild_score_buckets
+
+
+class Command(BaseCommand):
+    help = '''Заново строит распределения оценок произведений одним
+        сгруппированным запросом по отзывам. С флагом --check только
+        проверяет расхождения.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить распределения, не изменяя данные.'
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            actual = {
+                (row['title_id'], row['score'], row['count'])
+                for row in count_scores(Review)
+            }
+            stored = set(
+                ScoreBucket.objects.filter(count__gt=0)
+                .values_list('title_id', 'score', 'count')
+            )
+            if actual != stored:
+                raise CommandError(
+                    'Распределения оценок расходятся с отзывами у '
+                    f'{len({row[0] for row in actual ^ stored})} '
+                    'произведений.'
+                )
+            self.stdout.write(self.style.SUCCESS(
+                'Распределения оценок совпадают с отзывами.')
+            )
+            return
+        with transaction.atomic():
+            created = rebuild_score_buckets(ScoreBucket, Review)
+        self.stdout.write(self.style.SUCCESS(
+            f'Распределения оценок перестроены, корзин: {created}.')
+        )
@@ -0,0 +1,24 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from reviews.models import Comment, Review, Title
+from reviews.search import rebuild_search_index
+
+SEARCHABLE_MODELS = (Title, Review, Comment)
+
+
+class Command(BaseCommand):
+    help = '''Заново заполняет полнотекстовый индекс произведений, отзывов
+        и комментариев. Нужна после массовой загрузки в обход сигналов.'''
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuilt = rebuild_search_index(connection, SEARCHABLE_MODELS)
+        if not rebuilt:
+            raise CommandError(
+                'Полнотекстовый индекс недоступен для этой базы данных: '
+                'поиск выполняется через icontains.'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'Полнотекстовый индекс перестроен.')
+        )
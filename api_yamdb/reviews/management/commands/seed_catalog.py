@@ -0,0 +1,166 @@
+import random
+import time
+
+from django.core.management import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from reviews.models import (Category, Comment, Genre, Review, ScoreBucket,
+                            Title, User)
+from reviews.counters import rebuild_comments_count
+from reviews.ratings import rebuild_ratings, rebuild_score_buckets
+from reviews.search import rebuild_search_index
+from .loadcsv import DEFAULT_BATCH_SIZE, batches
+
+SEED_PREFIX = 'bench'
+# Модели, которым команда сама назначает id.
+EXPLICIT_ID_MODELS = (User, Category, Genre, Title, Review)
+
+
+def next_id(model):
+    return (model.objects.aggregate(value=Max('id'))['value'] or 0) + 1
+
+
+def reset_sequences(models):
+    """Сдвигает последовательности id за максимальный id таблиц.
+
+    bulk_create с явными id не продвигает последовательности
+    PostgreSQL, и следующий INSERT без id падает на занятом ключе.
+    На SQLite список команд пуст.
+    """
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+class Command(BaseCommand):
+    help = '''Заполняет базу синтетическим каталогом для нагрузочных тестов.
+        Данные генерируются детерминированно из --seed.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', default=1000, type=int)
+        parser.add_argument('--categories', default=10, type=int)
+        parser.add_argument('--genres', default=50, type=int)
+        parser.add_argument('--titles', default=10000, type=int)
+        parser.add_argument(
+            '--reviews-per-title',
+            default=10,
+            type=int,
+            help='Не больше --users: один пользователь - один отзыв.'
+        )
+        parser.add_argument('--comments-per-review', default=2, type=int)
+        parser.add_argument('--batch-size', default=DEFAULT_BATCH_SIZE,
+                            type=int)
+        parser.add_argument('--seed', default=0, type=int)
+
+    def create(self, model, objects, batch_size):
+        """Пишет объекты пачками и сообщает о скорости загрузки."""
+        created = 0
+        started = time.monotonic()
+        for batch in batches(objects, batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            created += len(batch)
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.stdout.write(
+            f'{model._meta.verbose_name_plural}: {created} '
+            f'({created / elapsed:.0f} строк/с)'
+        )
+        return created
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        users = options['users']
+        reviews_per_title = min(options['reviews_per_title'], users)
+
+        first_user = next_id(User)
+        self.create(User, (
+            User(
+                id=first_user + idx,
+                username=f'{SEED_PREFIX}_user_{first_user + idx}',
+                email=f'{SEED_PREFIX}_user_{first_user + idx}@yamdb.fake',
+            )
+            for idx in range(users)
+        ), batch_size)
+        user_ids = range(first_user, first_user + users)
+
+        first_category = next_id(Category)
+        category_ids = range(
+            first_category, first_category + options['categories']
+        )
+        self.create(Category, (
+            Category(
+                id=pk, name=f'Категория {pk}', slug=f'{SEED_PREFIX}-c{pk}'
+            )
+            for pk in category_ids
+        ), batch_size)
+
+        first_genre = next_id(Genre)
+        genre_ids = range(first_genre, first_genre + options['genres'])
+        self.create(Genre, (
+            Genre(id=pk, name=f'Жанр {pk}', slug=f'{SEED_PREFIX}-g{pk}')
+            for pk in genre_ids
+        ), batch_size)
+
+        first_title = next_id(Title)
+        title_ids = range(first_title, first_title + options['titles'])
+        self.create(Title, (
+            Title(
+                id=pk,
+                name=f'Произведение {pk}',
+                year=rng.randint(1900, 2020),
+                description=f'Описание произведения {pk}',
+                category_id=rng.choice(category_ids) if category_ids else None,
+            )
+            for pk in title_ids
+        ), batch_size)
+        if genre_ids:
+            self.create(Title.genre.through, (
+                Title.genre.through(title_id=title_id, genre_id=genre_id)
+                for title_id in title_ids
+                for genre_id in rng.sample(
+                    genre_ids, min(len(genre_ids), rng.randint(1, 3))
+                )
+            ), batch_size)
+
+        first_review = next_id(Review)
+        self.create(Review, (
+            Review(
+                id=first_review + idx * reviews_per_title + offset,
+                title_id=title_id,
+                author_id=user_ids[(idx + offset) % users],
+                text=f'Отзыв {offset} на произведение {title_id}',
+                score=rng.randint(1, 10),
+            )
+            for idx, title_id in enumerate(title_ids)
+            for offset in range(reviews_per_title)
+        ), batch_size)
+        review_count = len(title_ids) * reviews_per_title
+
+        self.create(Comment, (
+            Comment(
+                review_id=first_review + idx,
+                author_id=rng.choice(user_ids),
+                text=f'Комментарий {offset} к отзыву {first_review + idx}',
+            )
+            for idx in range(review_count)
+            for offset in range(options['comments_per_review'])
+        ), batch_size)
+        reset_sequences(EXPLICIT_ID_MODELS)
+
+        rebuild_ratings(
+            Title.objects.filter(id__gte=first_title), Review
+        )
+        rebuild_score_buckets(
+            ScoreBucket, Review,
+            Title.objects.filter(id__gte=first_title).values('id'),
+        )
+        rebuild_comments_count(
+            Review.objects.filter(id__gte=first_review), Comment
+        )
+        with transaction.atomic():
+            rebuild_search_index(connection, (Title, Review, Comment))
+        self.stdout.write(self.style.SUCCESS('Синтетический каталог создан.'))
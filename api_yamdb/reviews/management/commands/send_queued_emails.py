@@ -0,0 +1,128 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from reviews.models import QueuedEmail
+
+
+class Command(BaseCommand):
+    help = '''Отправляет письма из очереди пачками через одно соединение.
+        Неудачные отправки повторяются с экспоненциальной задержкой.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            default=100,
+            type=int,
+            help='Сколько писем отправлять через одно соединение.'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Не завершаться, а ждать новые письма.'
+        )
+        parser.add_argument(
+            '--interval',
+            default=5,
+            type=float,
+            help='Пауза между проверками очереди в режиме --loop, секунд.'
+        )
+
+    def claim(self, batch_size):
+        """Закрепляет пачку писем за процессом в короткой транзакции.
+
+        Письма помечаются сроком аренды, поэтому другие процессы их не
+        берут, а блокировка строк не держится на время отправки.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                QueuedEmail.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(leased_until__isnull=True) | Q(leased_until__lte=now),
+                    sent__isnull=True,
+                    next_attempt__lte=now,
+                    attempts__lt=settings.EMAIL_QUEUE_MAX_ATTEMPTS,
+                )
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            QueuedEmail.objects.filter(pk__in=ids).update(
+                leased_until=now + timedelta(
+                    seconds=settings.EMAIL_QUEUE_LEASE
+                )
+            )
+        return list(QueuedEmail.objects.filter(pk__in=ids))
+
+    def send_batch(self, batch_size):
+        """Отправляет одну пачку писем и возвращает её размер."""
+        batch = self.claim(batch_size)
+        if not batch:
+            return 0
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as error:
+            # Сервер недоступен: попытка засчитывается всем письмам
+            # пачки, иначе они бы повторялись без задержки.
+            for email in batch:
+                email.attempts += 1
+                self.fail(email, error)
+        else:
+            try:
+                for email in batch:
+                    self.send(email, connection)
+            finally:
+                connection.close()
+        for email in batch:
+            email.leased_until = None
+        with transaction.atomic():
+            QueuedEmail.objects.bulk_update(batch, [
+                'sent', 'attempts', 'next_attempt', 'last_error',
+                'leased_until',
+            ])
+        return len(batch)
+
+    def send(self, email, connection):
+        email.attempts += 1
+        try:
+            EmailMessage(
+                subject=email.subject,
+                body=email.message,
+                from_email=email.from_email,
+                to=[email.recipient],
+                connection=connection,
+            ).send()
+        except Exception as error:
+            self.fail(email, error)
+        else:
+            email.sent = timezone.now()
+            email.last_error = ''
+
+    def fail(self, email, error):
+        """Откладывает следующую попытку с экспоненциальной задержкой."""
+        delay = settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** (email.attempts - 1)
+        email.next_attempt = timezone.now() + timedelta(seconds=delay)
+        email.last_error = str(error)
+        self.stderr.write(self.style.ERROR(
+            f'Не удалось отправить письмо {email.pk}: {error}')
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            sent = self.send_batch(options['batch_size'])
+            total += sent
+            if sent:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано писем из очереди: {total}.')
+        )
@@ -0,0 +1,52 @@
+# Generated by Django 3.2 on 2026-10-18 17:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_ratings(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+
+    def aggregate(expression):
+        return Subquery(
+            Review.objects.filter(title=OuterRef('pk'))
+            .order_by()
+            .values('title')
+            .annotate(value=expression)
+            .values('value'),
+            output_field=models.IntegerField(),
+        )
+
+    Title.objects.update(
+        rating_sum=Coalesce(aggregate(Sum('score')), 0),
+        rating_count=Coalesce(aggregate(Count('id')), 0),
+        rating=aggregate(Sum('score') / Count('id')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.PositiveSmallIntegerField(db_index=True, editable=False, null=True, verbose_name='Рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество оценок'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 3.2 on 2026-10-18 17:40
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+BATCH_SIZE = 1000
+
+
+def backfill_name_lower(Title):
+    batch = []
+    titles = Title.objects.only('id', 'name').iterator(chunk_size=BATCH_SIZE)
+    for title in titles:
+        title.name_lower = title.name.lower()
+        batch.append(title)
+        if len(batch) == BATCH_SIZE:
+            Title.objects.bulk_update(batch, ['name_lower'])
+            batch = []
+    Title.objects.bulk_update(batch, ['name_lower'])
+
+
+def lowercase_slugs(model):
+    collisions = list(
+        model.objects.values(lower=Lower('slug'))
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .values_list('lower', flat=True)
+    )
+    if collisions:
+        raise ValueError(
+            f'{model.__name__}: слаги совпадают без учёта регистра '
+            f'{collisions}. Переименуйте дубликаты и повторите миграцию.'
+        )
+    model.objects.exclude(slug=Lower('slug')).update(slug=Lower('slug'))
+
+
+def normalize_lookups(apps, schema_editor):
+    backfill_name_lower(apps.get_model('reviews', 'Title'))
+    for model_name in ('Category', 'Genre'):
+        lowercase_slugs(apps.get_model('reviews', model_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='title',
+            name='title_name_lower_idx',
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='name_lower',
+            field=models.CharField(default='', editable=False, max_length=256, verbose_name='Название в нижнем регистре'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(normalize_lookups, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['name_lower'], name='title_name_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 3.2 on 2026-10-18 18:10
+
+from django.db import OperationalError, ProgrammingError, migrations
+
+# Копия схемы индекса из reviews.search на момент миграции: миграции не
+# должны зависеть от кода, который меняется вместе с приложением.
+SEARCH_TABLE = 'reviews_search_index'
+KIND_STEP = 4
+BATCH_SIZE = 1000
+CREATE_SQL = {
+    'sqlite': (
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} "
+        f"USING fts5(name, body, tokenize='unicode61')",
+    ),
+    'postgresql': (
+        f'CREATE TABLE {SEARCH_TABLE} '
+        f'(id bigint PRIMARY KEY, document tsvector NOT NULL)',
+        f'CREATE INDEX {SEARCH_TABLE}_document_idx '
+        f'ON {SEARCH_TABLE} USING GIN (document)',
+    ),
+}
+INSERT_SQL = {
+    'sqlite': (
+        f'INSERT INTO {SEARCH_TABLE} (rowid, name, body) VALUES (%s, %s, %s)'
+    ),
+    'postgresql': (
+        f"INSERT INTO {SEARCH_TABLE} (id, document) VALUES (%s, "
+        f"setweight(to_tsvector('simple', %s), 'A') || "
+        f"setweight(to_tsvector('simple', %s), 'B'))"
+    ),
+}
+# Модель, номер типа документа, поля заголовка и текста.
+DOCUMENTS = (
+    ('Title', 1, 'name', 'description'),
+    ('Review', 2, None, 'text'),
+    ('Comment', 3, None, 'text'),
+)
+
+
+def fill_search_index(apps, connection):
+    with connection.cursor() as cursor:
+        for model_name, kind, name_field, body_field in DOCUMENTS:
+            model = apps.get_model('reviews', model_name)
+            rows = model.objects.order_by('pk').values_list(
+                'pk', name_field or body_field, body_field
+            ).iterator(chunk_size=BATCH_SIZE)
+            batch = []
+            for pk, name, body in rows:
+                batch.append((
+                    pk * KIND_STEP + kind,
+                    name if name_field else '',
+                    body or '',
+                ))
+                if len(batch) == BATCH_SIZE:
+                    cursor.executemany(INSERT_SQL[connection.vendor], batch)
+                    batch = []
+            if batch:
+                cursor.executemany(INSERT_SQL[connection.vendor], batch)
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 на SQLite и tsvector на PostgreSQL; на остальных СУБД таблица
+    # не создаётся, и поиск работает через icontains.
+    connection = schema_editor.connection
+    if connection.vendor not in CREATE_SQL:
+        return
+    try:
+        with connection.cursor() as cursor:
+            for sql in CREATE_SQL[connection.vendor]:
+                cursor.execute(sql)
+    except (OperationalError, ProgrammingError):
+        # SQLite собран без FTS5.
+        return
+    fill_search_index(apps, connection)
+
+
+def delete_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE_SQL:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_normalized_lookups'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, delete_search_index),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 3.2 on 2026-10-18 17:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_score_buckets(apps, schema_editor):
+    # Десять корзин каждого произведения одним INSERT ... SELECT: оценки
+    # соединяются с произведениями, отзывы считаются LEFT JOIN.
+    quote = schema_editor.quote_name
+    ScoreBucket = apps.get_model('reviews', 'ScoreBucket')
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    scores = ' UNION ALL '.join(
+        f'SELECT {score} AS score' for score in range(1, 11)
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(ScoreBucket._meta.db_table)} '
+            f'(title_id, score, {quote("count")}) '
+            f'SELECT t.id, s.score, COUNT(r.id) '
+            f'FROM {quote(Title._meta.db_table)} t '
+            f'CROSS JOIN ({scores}) s '
+            f'LEFT JOIN {quote(Review._meta.db_table)} r '
+            f'ON r.title_id = t.id AND r.score = s.score '
+            f'GROUP BY t.id, s.score'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_review_comments_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField(verbose_name='Оценка')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('title', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='score_buckets', to='reviews.title', verbose_name='Произведение')),
+            ],
+            options={
+                'verbose_name': 'Распределение оценок',
+                'verbose_name_plural': 'Распределения оценок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='scorebucket',
+            constraint=models.UniqueConstraint(fields=('title', 'score'), name='unique_score_bucket'),
+        ),
+        migrations.RunPython(fill_score_buckets, migrations.RunPython.noop),
+    ]
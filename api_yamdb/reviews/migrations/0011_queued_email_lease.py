@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_score_buckets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queuedemail',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Отправляется до'),
+        ),
+    ]
@@ -1,8 +1,9 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.utils import timezone
 
 from reviews.validators import (validate_non_reserved, validate_year)
 
@@ -39,6 +40,15 @@ class User(AbstractUser):
         blank=True,
         null=True,
     )
+    claims_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Версия claims токенов',
+    )
+
+    # Поля, которые попадают в claims access-токена.
+    CLAIM_FIELDS = ('username', 'role', 'is_staff', 'is_superuser',
+                    'is_active')
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -48,6 +58,31 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Имя на момент загрузки: при его смене меняются отзывы и
+        # комментарии, в которых выводится автор.
+        instance._loaded_username = instance.__dict__.get('username')
+        instance._loaded_claims = instance.get_claims()
+        return instance
+
+    def get_claims(self):
+        return tuple(self.__dict__.get(field) for field in self.CLAIM_FIELDS)
+
+    def save(self, *args, **kwargs):
+        # Смена роли или флагов отзывает claims выданных токенов: они
+        # перестают совпадать по версии с пользователем в базе.
+        if not self._state.adding and self.get_claims() != getattr(
+            self, '_loaded_claims', None
+        ):
+            self.claims_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'claims_version'}
+        super().save(*args, **kwargs)
+        self._loaded_claims = self.get_claims()
+
     @property
     def is_moderator(self):
         return self.role == self.UserRoles.MODERATOR or self.is_staff
@@ -57,7 +92,81 @@ class User(AbstractUser):
         return (self.role == self.UserRoles.ADMIN) or self.is_superuser
 
 
-class BaseCategoryGenre(models.Model):
+class NormalizedQuerySet(models.QuerySet):
+    """QuerySet, нормализующий объекты и при массовой записи.
+
+    bulk_create и bulk_update не вызывают save(), поэтому нормализация
+    выполняется здесь; производные поля из DERIVED_FIELDS модели
+    обновляются вместе с полями, из которых они вычисляются.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.normalize()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.normalize()
+        fields = list(fields)
+        fields += [
+            derived for source, derived in self.model.DERIVED_FIELDS.items()
+            if source in fields and derived not in fields
+        ]
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+
+class NormalizedModel(models.Model):
+    """Модель, приводящая поля для поиска к каноническому виду."""
+    DERIVED_FIELDS = {}
+
+    objects = NormalizedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def normalize(self):
+        """Приводит поля к каноническому виду, по умолчанию не меняет их."""
+
+    def clean(self):
+        # Проверка уникальности в формах идёт после clean(), то есть уже
+        # по нормализованным значениям.
+        super().clean()
+        self.normalize()
+
+    def save(self, *args, **kwargs):
+        self.normalize()
+        super().save(*args, **kwargs)
+
+
+class CountersMixin:
+    """Не перезаписывает денормализованные счётчики при save().
+
+    Счётчики из COUNTER_FIELDS меняются только UPDATE с F-выражениями;
+    сохранение ранее загруженного объекта иначе вернуло бы им значения,
+    устаревшие за время запроса.
+    """
+    COUNTER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class BaseCategoryGenre(NormalizedModel):
     """Абстрактная модель для категорий и жанров"""
     name = models.CharField(
         verbose_name='Название',
@@ -75,6 +184,11 @@ class BaseCategoryGenre(models.Model):
     def __str__(self):
         return self.name
 
+    def normalize(self):
+        # Слаги хранятся в нижнем регистре, чтобы фильтры сравнивали их
+        # точным равенством по уникальному индексу.
+        self.slug = self.slug.lower()
+
 
 class Category(BaseCategoryGenre):
     """Модель категорий"""
@@ -90,12 +204,20 @@ class Genre(BaseCategoryGenre):
         verbose_name_plural = 'Жанры'
 
 
-class Title(models.Model):
+class Title(CountersMixin, NormalizedModel):
     """Модель произведений"""
+    DERIVED_FIELDS = {'name': 'name_lower'}
+    COUNTER_FIELDS = ('rating_sum', 'rating_count', 'rating')
+
     name = models.CharField(
         verbose_name='Название',
         max_length=settings.CATEGORY_GENRE_TITLE_NAME_LENGTH
     )
+    name_lower = models.CharField(
+        verbose_name='Название в нижнем регистре',
+        max_length=settings.CATEGORY_GENRE_TITLE_NAME_LENGTH,
+        editable=False,
+    )
     year = models.PositiveSmallIntegerField(
         verbose_name='Год создания',
         validators=[validate_year]
@@ -116,14 +238,38 @@ class Title(models.Model):
         null=True,
         verbose_name='Категория'
     )
+    rating_sum = models.PositiveIntegerField(
+        verbose_name='Сумма оценок',
+        default=0,
+        editable=False,
+    )
+    rating_count = models.PositiveIntegerField(
+        verbose_name='Количество оценок',
+        default=0,
+        editable=False,
+    )
+    rating = models.PositiveSmallIntegerField(
+        verbose_name='Рейтинг',
+        null=True,
+        editable=False,
+        db_index=True,
+    )
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        indexes = [
+            models.Index(fields=['name_lower'], name='title_name_lower_idx'),
+            models.Index(fields=['year'], name='title_year_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def normalize(self):
+        # В отличие от LOWER() в SQLite, str.lower() понимает кириллицу.
+        self.name_lower = self.name.lower()
+
 
 class ReviewCommentBase(models.Model):
     """Абстрактная модель для отзывов и комментариев"""
@@ -143,17 +289,24 @@ class ReviewCommentBase(models.Model):
 
     class Meta:
         abstract = True
+        # Новые записи первыми; id различает записи с одинаковой датой,
+        # поэтому страницы не перемешиваются. Порядок совпадает с
+        # составными индексами (fk, pub_date, id).
+        ordering = ('-pub_date', '-id')
 
 
-class Review(ReviewCommentBase):
+class Review(CountersMixin, ReviewCommentBase):
     """Модель отзывов к произведениям"""
+    COUNTER_FIELDS = ('comments_count',)
     SCORE_ERROR_MESSAGE = "Оценка должна быть в диапазоне от 1 до 10"
 
     title = models.ForeignKey(
         Title,
         related_name='reviews',
         on_delete=models.CASCADE,
-        verbose_name='Произведение'
+        verbose_name='Произведение',
+        # Поиск по title_id обслуживает review_title_pub_date_idx.
+        db_index=False,
     )
     score = models.PositiveSmallIntegerField(
         verbose_name='Оценка',
@@ -162,6 +315,11 @@ class Review(ReviewCommentBase):
             MaxValueValidator(10, message=SCORE_ERROR_MESSAGE)
         ]
     )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False,
+    )
 
     class Meta(ReviewCommentBase.Meta):
         verbose_name = 'Отзыв'
@@ -170,10 +328,40 @@ class Review(ReviewCommentBase):
             models.UniqueConstraint(fields=['author', 'title'],
                                     name='unique_review')
         ]
+        indexes = [
+            models.Index(fields=['title', 'pub_date', 'id'],
+                         name='review_title_pub_date_idx')
+        ]
 
     def __str__(self):
         return self.text
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Оценка на момент загрузки нужна, чтобы пересчитать рейтинг
+        # произведения на разницу при редактировании отзыва.
+        instance._loaded_score = instance.__dict__.get('score')
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding or (
+            update_fields is not None and 'score' not in update_fields
+        ):
+            return super().save(*args, **kwargs)
+        with transaction.atomic(
+            using=kwargs.get('using') or self._state.db, savepoint=False
+        ):
+            # Старая оценка берётся из заблокированной строки: оценка,
+            # прочитанная при загрузке, могла устареть, и два параллельных
+            # редактирования сдвинули бы рейтинг от одного значения.
+            self._loaded_score = type(self).objects.select_for_update(
+            ).filter(pk=self.pk).order_by().values_list(
+                'score', flat=True
+            ).first()
+            super().save(*args, **kwargs)
+
 
 class Comment(ReviewCommentBase):
     """Модель комментариев к отзывам"""
@@ -181,12 +369,101 @@ class Comment(ReviewCommentBase):
         Review,
         related_name='comments',
         on_delete=models.CASCADE,
-        verbose_name='Отзыв'
+        verbose_name='Отзыв',
+        # Поиск по review_id обслуживает comment_review_pub_date_idx.
+        db_index=False,
     )
 
     class Meta(ReviewCommentBase.Meta):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['review', 'pub_date', 'id'],
+                         name='comment_review_pub_date_idx')
+        ]
 
     def __str__(self):
         return self.text
+
+
+class ScoreBucket(models.Model):
+    """Количество отзывов с данной оценкой у произведения"""
+    title = models.ForeignKey(
+        Title,
+        related_name='score_buckets',
+        on_delete=models.CASCADE,
+        verbose_name='Произведение',
+        # Поиск по title_id обслуживает уникальный индекс (title, score).
+        db_index=False,
+    )
+    score = models.PositiveSmallIntegerField(verbose_name='Оценка')
+    count = models.PositiveIntegerField(
+        verbose_name='Количество отзывов',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Распределение оценок'
+        verbose_name_plural = 'Распределения оценок'
+        constraints = [
+            models.UniqueConstraint(fields=['title', 'score'],
+                                    name='unique_score_bucket')
+        ]
+
+    def __str__(self):
+        return f'{self.title_id}: {self.score} x {self.count}'
+
+
+class QueuedEmail(models.Model):
+    """Письмо в очереди на отправку"""
+    recipient = models.EmailField(
+        verbose_name='Получатель',
+        max_length=settings.MAX_LENGTH_FIELDS
+    )
+    from_email = models.EmailField(
+        verbose_name='Отправитель',
+        max_length=settings.MAX_LENGTH_FIELDS
+    )
+    subject = models.CharField(
+        verbose_name='Тема',
+        max_length=settings.CATEGORY_GENRE_TITLE_NAME_LENGTH
+    )
+    message = models.TextField(verbose_name='Текст')
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата постановки в очередь'
+    )
+    next_attempt = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Следующая попытка отправки'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Количество попыток'
+    )
+    sent = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата отправки'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+    leased_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Отправляется до'
+    )
+
+    class Meta:
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+        ordering = ('id',)
+        indexes = [
+            models.Index(fields=['sent', 'next_attempt'],
+                         name='queued_email_pending_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
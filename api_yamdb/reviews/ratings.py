@@ -0,0 +1,188 @@
+from django.db.models import (Case, Count, F, IntegerField, OuterRef, Q,
+                              Subquery, Sum, Value, When)
+from django.db.models.functions import Coalesce
+
+SCORES = range(1, 11)
+BUCKET_BATCH_SIZE = 1000
+
+
+def update_title_rating(titles, score_delta, count_delta):
+    """Атомарно сдвигает сумму и количество оценок произведений.
+
+    Рейтинг пересчитывается в том же UPDATE, в правой части которого
+    F-выражения ссылаются на значения до изменения. Возвращает число
+    изменённых произведений.
+    """
+    rating_sum = F('rating_sum') + score_delta
+    rating_count = F('rating_count') + count_delta
+    return titles.update(
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        rating=Case(
+            When(Q(rating_count__lte=-count_delta), then=Value(None)),
+            default=rating_sum / rating_count,
+            output_field=IntegerField(),
+        ),
+    )
+
+
+def _aggregate(review_model, expression):
+    return Subquery(
+        review_model.objects.filter(title=OuterRef('pk'))
+        .order_by()
+        .values('title')
+        .annotate(value=expression)
+        .values('value'),
+        output_field=IntegerField(),
+    )
+
+
+def annotate_actual_rating(queryset, review_model):
+    """Добавляет к произведениям агрегаты, посчитанные по отзывам."""
+    return queryset.annotate(
+        actual_sum=Coalesce(_aggregate(review_model, Sum('score')), 0),
+        actual_count=Coalesce(_aggregate(review_model, Count('id')), 0),
+        actual_rating=_aggregate(review_model, Sum('score') / Count('id')),
+    )
+
+
+def find_rating_drift(titles, review_model):
+    """Произведения, у которых сохранённый рейтинг расходится с отзывами."""
+    return annotate_actual_rating(titles, review_model).exclude(
+        rating_sum=F('actual_sum'),
+        rating_count=F('actual_count'),
+    )
+
+
+def rebuild_ratings(titles, review_model):
+    """Пересчитывает рейтинг произведений по отзывам одним UPDATE."""
+    return titles.update(
+        rating_sum=Coalesce(_aggregate(review_model, Sum('score')), 0),
+        rating_count=Coalesce(_aggregate(review_model, Count('id')), 0),
+        rating=_aggregate(review_model, Sum('score') / Count('id')),
+    )
+
+
+def create_score_buckets(bucket_model, title_ids):
+    """Создаёт пустые корзины всех оценок для произведений."""
+    bucket_model.objects.bulk_create(
+        (
+            bucket_model(title_id=title_id, score=score)
+            for title_id in title_ids
+            for score in SCORES
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def update_score_bucket(bucket_model, title_id, score, delta):
+    """Атомарно сдвигает счётчик оценки score у произведения."""
+    buckets = bucket_model.objects.filter(title_id=title_id, score=score)
+    if buckets.update(count=F('count') + delta) or delta < 0:
+        return
+    # Корзин нет у произведений, созданных в обход сигналов.
+    create_score_buckets(bucket_model, [title_id])
+    buckets.update(count=F('count') + delta)
+
+
+def move_score(bucket_model, review_model, title_id, old_score, new_score):
+    """Переносит отзыв из корзины old_score в new_score одним UPDATE.
+
+    old_score должен быть прочитан из заблокированной строки отзыва в
+    той же транзакции (см. Review.save): по устаревшей оценке второе
+    параллельное редактирование уводит корзину в минус.
+    """
+    moved = bucket_model.objects.filter(
+        title_id=title_id, score__in=(old_score, new_score)
+    ).update(count=Case(
+        When(score=old_score, then=F('count') - 1),
+        default=F('count') + 1,
+    ))
+    if moved < 2:
+        rebuild_score_buckets(bucket_model, review_model, [title_id])
+
+
+def count_scores(review_model, reviews=None):
+    """Количество отзывов по (произведение, оценка) одним GROUP BY."""
+    if reviews is None:
+        reviews = review_model.objects.all()
+    return reviews.order_by().values('title_id', 'score').annotate(
+        count=Count('id')
+    )
+
+
+def rebuild_score_buckets(bucket_model, review_model, title_ids=None,
+                          batch_size=BUCKET_BATCH_SIZE):
+    """Заново строит распределения оценок по отзывам.
+
+    Произведения и сгруппированные по (произведение, оценка) отзывы
+    читаются двумя потоками, упорядоченными по id произведения, и
+    сливаются без промежуточного словаря. Корзины вставляются пачками
+    по batch_size, поэтому память не зависит от размера каталога. Без
+    title_ids перестраиваются распределения всех произведений.
+    """
+    titles = review_model._meta.get_field('title').related_model.objects
+    buckets = bucket_model.objects.all()
+    reviews = review_model.objects.all()
+    if title_ids is not None:
+        titles = titles.filter(pk__in=title_ids)
+        buckets = buckets.filter(title_id__in=title_ids)
+        reviews = reviews.filter(title_id__in=title_ids)
+    buckets.delete()
+    counts = count_scores(review_model, reviews).order_by(
+        'title_id', 'score'
+    ).iterator(chunk_size=batch_size)
+    row = next(counts, None)
+    created = 0
+    batch = []
+    for title_id in titles.order_by('pk').values_list(
+        'pk', flat=True
+    ).iterator(chunk_size=batch_size):
+        scores = {}
+        while row is not None and row['title_id'] <= title_id:
+            if row['title_id'] == title_id:
+                scores[row['score']] = row['count']
+            row = next(counts, None)
+        batch.extend(
+            bucket_model(
+                title_id=title_id, score=score, count=scores.get(score, 0)
+            )
+            for score in SCORES
+        )
+        if len(batch) >= batch_size:
+            created += len(bucket_model.objects.bulk_create(batch))
+            batch = []
+    return created + len(bucket_model.objects.bulk_create(batch))
+
+
+def score_statistics(buckets):
+    """Гистограмма, количество, среднее и медиана по корзинам оценок."""
+    histogram = dict.fromkeys(SCORES, 0)
+    for score, count in buckets:
+        histogram[score] += count
+    count = sum(histogram.values())
+    if not count:
+        return {
+            'histogram': histogram, 'count': 0, 'mean': None, 'median': None
+        }
+    total = sum(score * number for score, number in histogram.items())
+    return {
+        'histogram': histogram,
+        'count': count,
+        'mean': round(total / count, 2),
+        'median': _median(histogram, count),
+    }
+
+
+def _median(histogram, count):
+    middle = []
+    seen = 0
+    # Позиции (0-based) средних элементов отсортированного ряда оценок.
+    positions = sorted({(count - 1) // 2, count // 2})
+    for score, number in histogram.items():
+        while positions and positions[0] < seen + number:
+            middle.append(score)
+            positions.pop(0)
+        seen += number
+    return sum(middle) / len(middle)
@@ -0,0 +1,241 @@
+"""Полнотекстовый поиск по произведениям, отзывам и комментариям.
+
+Документы хранятся в одной таблице SEARCH_TABLE: на SQLite это
+виртуальная таблица FTS5, на PostgreSQL - таблица с tsvector и GIN-индексом.
+Идентификатор документа кодирует тип и id объекта, поэтому документ
+обновляется и удаляется по первичному ключу. Таблица создаётся миграцией
+только там, где это поддерживается; иначе поиск откатывается к icontains.
+"""
+import re
+
+from django.db import OperationalError, ProgrammingError, connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'reviews_search_index'
+KINDS = {'title': 1, 'review': 2, 'comment': 3}
+KIND_STEP = 4
+DOCUMENT_FIELDS = {
+    'title': ('name', 'description'),
+    'review': ('text',),
+    'comment': ('text',),
+}
+TOKEN = re.compile(r'\w+')
+
+_available = {}
+
+
+def get_kind(model):
+    return model._meta.model_name
+
+
+def document_id(kind, object_id):
+    return object_id * KIND_STEP + KINDS[kind]
+
+
+def get_document(kind, obj):
+    """Заголовок и текст документа; заголовок весит больше текста."""
+    if kind == 'title':
+        return obj.name, obj.description or ''
+    return '', obj.text
+
+
+class SqliteBackend:
+    create_sql = (
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} "
+        f"USING fts5(name, body, tokenize='unicode61')",
+    )
+    drop_sql = f'DROP TABLE IF EXISTS {SEARCH_TABLE}'
+    document_column = f'{SEARCH_TABLE}.rowid'
+    match_sql = f'{SEARCH_TABLE} MATCH %s'
+
+    def prepare_query(self, query):
+        # Слова запроса ищутся как префиксы; кавычки не дают
+        # пользовательскому вводу попасть в синтаксис MATCH.
+        return ' '.join(f'"{token}"*' for token in TOKEN.findall(query))
+
+    def rank(self, query):
+        # Заголовок весит в 10 раз больше текста; bm25 тем меньше, чем
+        # документ релевантнее.
+        return f'-bm25({SEARCH_TABLE}, 10.0, 1.0)', []
+
+    def index(self, cursor, doc_id, name, body):
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, name, body) '
+            f'VALUES (%s, %s, %s)',
+            [doc_id, name, body],
+        )
+
+    def remove(self, cursor, doc_id):
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [doc_id]
+        )
+
+
+class PostgresBackend:
+    create_sql = (
+        f'CREATE TABLE {SEARCH_TABLE} '
+        f'(id bigint PRIMARY KEY, document tsvector NOT NULL)',
+        f'CREATE INDEX {SEARCH_TABLE}_document_idx '
+        f'ON {SEARCH_TABLE} USING GIN (document)',
+    )
+    drop_sql = f'DROP TABLE IF EXISTS {SEARCH_TABLE}'
+    document_column = f'{SEARCH_TABLE}.id'
+    match_sql = (
+        f"{SEARCH_TABLE}.document @@ plainto_tsquery('simple', %s)"
+    )
+
+    def prepare_query(self, query):
+        return query
+
+    def rank(self, query):
+        return (
+            f"ts_rank({SEARCH_TABLE}.document, "
+            f"plainto_tsquery('simple', %s))",
+            [query],
+        )
+
+    def index(self, cursor, doc_id, name, body):
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (id, document) VALUES (%s, "
+            f"setweight(to_tsvector('simple', %s), 'A') || "
+            f"setweight(to_tsvector('simple', %s), 'B')) "
+            f"ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document",
+            [doc_id, name, body],
+        )
+
+    def remove(self, cursor, doc_id):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE id = %s', [doc_id])
+
+
+BACKENDS = {'sqlite': SqliteBackend, 'postgresql': PostgresBackend}
+
+
+def availability_key(connection):
+    return connection.alias, str(connection.settings_dict['NAME'])
+
+
+def create_search_table(connection):
+    """Создаёт таблицу индекса; возвращает False, если СУБД не умеет."""
+    _available.pop(availability_key(connection), None)
+    backend_class = BACKENDS.get(connection.vendor)
+    if backend_class is None:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            for sql in backend_class.create_sql:
+                cursor.execute(sql)
+    except (OperationalError, ProgrammingError):
+        # SQLite собран без FTS5.
+        return False
+    return True
+
+
+def drop_search_table(connection):
+    _available.pop(availability_key(connection), None)
+    backend_class = BACKENDS.get(connection.vendor)
+    if backend_class is not None:
+        with connection.cursor() as cursor:
+            cursor.execute(backend_class.drop_sql)
+
+
+def get_backend(connection):
+    """Бэкенд поиска или None, если таблицы индекса в базе нет."""
+    key = availability_key(connection)
+    if key not in _available:
+        _available[key] = (
+            connection.vendor in BACKENDS
+            and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    if not _available[key]:
+        return None
+    return BACKENDS[connection.vendor]()
+
+
+def refresh_backend(connection):
+    """Заново проверяет наличие таблицы индекса после миграций."""
+    _available.pop(availability_key(connection), None)
+    return get_backend(connection)
+
+
+def index_objects(connection, objects):
+    backend = get_backend(connection)
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        for obj in objects:
+            kind = get_kind(obj)
+            backend.index(
+                cursor, document_id(kind, obj.pk), *get_document(kind, obj)
+            )
+
+
+def remove_object(connection, obj):
+    backend = get_backend(connection)
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        backend.remove(cursor, document_id(get_kind(obj), obj.pk))
+
+
+def rebuild_search_index(connection, models, batch_size=1000):
+    """Заново заполняет индекс всеми объектами моделей models."""
+    backend = get_backend(connection)
+    if backend is None:
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+    for model in models:
+        objects = model.objects.only(*DOCUMENT_FIELDS[get_kind(model)])
+        index_objects(
+            connection, objects.order_by('pk').iterator(chunk_size=batch_size)
+        )
+    return True
+
+
+def search_icontains(queryset, query):
+    """Поиск подстроки без индекса: полный просмотр таблицы."""
+    condition = Q()
+    for field in DOCUMENT_FIELDS[get_kind(queryset.model)]:
+        condition |= Q(**{f'{field}__icontains': query})
+    return queryset.filter(condition)
+
+
+def search(queryset, query):
+    """Фильтрует queryset по запросу и упорядочивает по релевантности.
+
+    Без индекса выполняется icontains по тем же полям без ранжирования.
+    """
+    connection = connections[queryset.db]
+    kind = get_kind(queryset.model)
+    backend = get_backend(connection)
+    if backend is None:
+        return search_icontains(queryset, query)
+    query = backend.prepare_query(query)
+    if not query:
+        return queryset.none()
+    column = '{}.{}'.format(
+        connection.ops.quote_name(queryset.model._meta.db_table),
+        connection.ops.quote_name(queryset.model._meta.pk.column),
+    )
+    # Подзапрос по таблице индекса выбирает id найденных документов,
+    # объекты достаются по первичному ключу. Релевантность считается
+    # отдельным подзапросом к документу объекта по его rowid/id.
+    document = backend.document_column
+    rank_sql, rank_params = backend.rank(query)
+    found = RawSQL(
+        f'SELECT {document} / {KIND_STEP} FROM {SEARCH_TABLE} '
+        f'WHERE {backend.match_sql} '
+        f'AND {document} %% {KIND_STEP} = {KINDS[kind]}',
+        [query],
+    )
+    rank = RawSQL(
+        f'SELECT {rank_sql} FROM {SEARCH_TABLE} '
+        f'WHERE {backend.match_sql} '
+        f'AND {document} = {column} * {KIND_STEP} + {KINDS[kind]}',
+        [*rank_params, query],
+        output_field=FloatField(),
+    )
+    return queryset.filter(pk__in=found).annotate(
+        search_rank=rank
+    ).order_by('-search_rank', 'pk')
@@ -0,0 +1,99 @@
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .counters import update_comments_count
+from .models import Comment, Review, ScoreBucket, Title
+from .ratings import (create_score_buckets, move_score, rebuild_ratings,
+                      rebuild_score_buckets, update_score_bucket,
+                      update_title_rating)
+from .search import index_objects, refresh_backend, remove_object
+
+SEARCHABLE_MODELS = (Title, Review, Comment)
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, created, **kwargs):
+    """Заводит новому произведению десять пустых корзин оценок."""
+    if created:
+        create_score_buckets(ScoreBucket, [instance.pk])
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    """Учитывает новую или изменённую оценку в рейтинге произведения."""
+    loaded_score = getattr(instance, '_loaded_score', None)
+    if created:
+        # Тот же UPDATE проверяет, что произведение существует: внешний
+        # ключ SQLite проверяется только при фиксации внешней транзакции.
+        if not update_title_rating(
+            Title.objects.filter(pk=instance.title_id), instance.score, 1
+        ):
+            raise Title.DoesNotExist(
+                f'Произведение {instance.title_id} не найдено'
+            )
+        update_score_bucket(ScoreBucket, instance.title_id, instance.score, 1)
+    elif loaded_score is None:
+        rebuild_ratings(Title.objects.filter(pk=instance.title_id), Review)
+        rebuild_score_buckets(ScoreBucket, Review, [instance.title_id])
+    elif instance.score != loaded_score:
+        update_title_rating(
+            Title.objects.filter(pk=instance.title_id),
+            instance.score - loaded_score,
+            0,
+        )
+        move_score(
+            ScoreBucket, Review, instance.title_id, loaded_score,
+            instance.score,
+        )
+    instance._loaded_score = instance.score
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """Убирает оценку удалённого отзыва из рейтинга произведения."""
+    update_title_rating(
+        Title.objects.filter(pk=instance.title_id), -instance.score, -1
+    )
+    update_score_bucket(ScoreBucket, instance.title_id, instance.score, -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    """Учитывает новый комментарий в счётчике отзыва."""
+    if created:
+        update_comments_count(Review.objects.filter(pk=instance.review_id), 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """Убирает удалённый комментарий из счётчика отзыва."""
+    update_comments_count(Review.objects.filter(pk=instance.review_id), -1)
+
+
+def searchable_saved(sender, instance, using, **kwargs):
+    """Обновляет документ объекта в полнотекстовом индексе."""
+    index_objects(connections[using], [instance])
+
+
+def searchable_deleted(sender, instance, using, **kwargs):
+    """Убирает документ удалённого объекта из полнотекстового индекса."""
+    remove_object(connections[using], instance)
+
+
+@receiver(post_migrate)
+def migrated(sender, using, **kwargs):
+    """Миграции могли создать или удалить таблицу поискового индекса."""
+    if sender.name == 'reviews':
+        refresh_backend(connections[using])
+
+
+for model in SEARCHABLE_MODELS:
+    post_save.connect(
+        searchable_saved, sender=model, dispatch_uid=f'search_saved_{model}'
+    )
+    post_delete.connect(
+        searchable_deleted,
+        sender=model,
+        dispatch_uid=f'search_deleted_{model}',
+    )
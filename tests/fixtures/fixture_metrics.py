@@ -0,0 +1,9 @@
+import pytest
+
+from api.metrics import registry
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    registry.clear()
+    yield
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def query_budget(settings):
+    """Проваливает тест, если эндпоинт превысил бюджет SQL-запросов."""
+    settings.QUERY_BUDGET_RAISE = True
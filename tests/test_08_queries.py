@@ -0,0 +1,91 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+
+def create_catalog(count):
+    category = Category.objects.create(name='Фильм', slug='films')
+    genres = [
+        Genre.objects.create(name='Ужасы', slug='horror'),
+        Genre.objects.create(name='Драма', slug='drama'),
+    ]
+    for idx in range(count):
+        title = Title.objects.create(
+            name=f'Произведение {idx}', year=2000, category=category
+        )
+        title.genre.set(genres)
+
+
+def count_queries(client, url):
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08Queries:
+
+    def test_01_titles_constant_queries(self, client):
+        create_catalog(20)
+        url = '/api/v1/titles/?limit={}'
+        small_page = count_queries(client, url.format(1))
+        large_page = count_queries(client, url.format(20))
+        assert small_page == large_page, (
+            'Проверьте, что количество SQL-запросов к `/api/v1/titles/` '
+            'не зависит от размера страницы.'
+        )
+
+    @pytest.mark.parametrize('kind', ['reviews', 'comments'])
+    def test_02_review_comment_pages(self, client, kind):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        User.objects.bulk_create(
+            User(username=f'author{idx}', email=f'author{idx}@yamdb.fake')
+            for idx in range(1000)
+        )
+        authors = list(User.objects.order_by('id'))
+        Review.objects.bulk_create(
+            Review(author=author, title=title, text='text', score=5)
+            for author in authors
+        )
+        review = Review.objects.order_by('id').first()
+        Comment.objects.bulk_create(
+            Comment(author=author, review=review, text='text')
+            for author in authors
+        )
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        model = Review
+        if kind == 'comments':
+            url = f'{url}{review.id}/comments/'
+            model = Comment
+        table = model._meta.db_table
+
+        for limit in (10, 100, 1000):
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(f'{url}?limit={limit}')
+            assert response.status_code == 200
+            results = response.json()['results']
+            assert len(results) == limit
+            assert all(item['author'] for item in results)
+            pages = [
+                query['sql'] for query in context.captured_queries
+                if 'COUNT(' not in query['sql']
+            ]
+            assert len(pages) == 1, (
+                f'Проверьте, что страница из {limit} объектов `{url}` '
+                'вместе с авторами выбирается одним SQL-запросом.'
+            )
+            assert 'reviews_user' in pages[0]
+            assert f'"{table}"."text"' in pages[0]
+            assert '"reviews_user"."email"' not in pages[0], (
+                'Проверьте, что для автора выбирается только username.'
+            )
+            expected = list(model.objects.values_list('id', flat=True)[:limit])
+            assert [item['id'] for item in results] == expected, (
+                'Проверьте, что список упорядочен по дате публикации и id.'
+            )
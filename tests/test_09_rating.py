@@ -0,0 +1,66 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from reviews.models import Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09Rating:
+
+    def test_01_rating_follows_reviews(self, admin, user, moderator):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        review = Review.objects.create(
+            author=admin, title=title, text='text', score=10
+        )
+        Review.objects.create(author=user, title=title, text='text', score=5)
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            15, 2, 7
+        ), 'Проверьте, что рейтинг пересчитывается при создании отзыва.'
+
+        review = Review.objects.get(pk=review.pk)
+        review.score = 2
+        review.save()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            7, 2, 3
+        ), 'Проверьте, что рейтинг пересчитывается при изменении оценки.'
+
+        Review.objects.filter(title=title).delete()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            0, 0, None
+        ), 'Проверьте, что рейтинг пересчитывается при удалении отзывов.'
+
+    def test_02_rebuild_ratings(self, admin):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        Review.objects.create(author=admin, title=title, text='text', score=8)
+        Title.objects.update(rating_sum=0, rating_count=0, rating=None)
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', check=True)
+        call_command('rebuild_ratings')
+        call_command('rebuild_ratings', check=True)
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            8, 1, 8
+        ), 'Проверьте, что команда rebuild_ratings восстанавливает рейтинг.'
+
+    def test_03_stale_instances(self, admin, user):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        review = Review.objects.create(
+            author=admin, title=title, text='text', score=5
+        )
+        Review.objects.create(author=user, title=title, text='text', score=5)
+        first = Review.objects.get(pk=review.pk)
+        second = Review.objects.get(pk=review.pk)
+        first.score = 7
+        first.save()
+        second.score = 9
+        second.save()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            14, 2, 7
+        ), (
+            'Проверьте, что рейтинг пересчитывается от оценки, сохранённой '
+            'в базе, а не от оценки устаревшего экземпляра отзыва.'
+        )
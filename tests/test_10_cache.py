@@ -0,0 +1,228 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+
+from api.cache import get_response_cache_stats
+from reviews.models import Category, Genre, Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10ResponseCache:
+
+    def test_01_categories_cached_until_change(self, client):
+        Category.objects.create(name='Фильм', slug='films')
+        url = '/api/v1/categories/'
+
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert response['X-Cache'] == 'MISS'
+        response = client.get(url)
+        assert response['X-Cache'] == 'HIT', (
+            f'Проверьте, что повторный GET-запрос к `{url}` отдаётся из кеша.'
+        )
+        assert response.json()['count'] == 1
+        assert get_response_cache_stats() == {'hits': 1, 'misses': 1}
+
+        Category.objects.create(name='Книги', slug='books')
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что кеш ответов сбрасывается при изменении категорий.'
+        )
+        assert response.json()['count'] == 2
+
+    def test_02_cache_key_includes_role(self, client, admin_client):
+        Category.objects.create(name='Фильм', slug='films')
+        url = '/api/v1/categories/'
+        assert client.get(url)['X-Cache'] == 'MISS'
+        assert admin_client.get(url)['X-Cache'] == 'MISS', (
+            'Проверьте, что роль пользователя входит в ключ кеша ответов.'
+        )
+        assert client.get(f'{url}?search=x')['X-Cache'] == 'MISS'
+
+    @pytest.mark.parametrize('cursor_first', [False, True])
+    def test_03_cache_key_includes_accept(self, client, cursor_first):
+        Title.objects.create(name='Терминатор', year=1984)
+        url = '/api/v1/titles/'
+        cursor = {'HTTP_ACCEPT': 'application/json; pagination=cursor'}
+        requests = [({}, True), (cursor, False)]
+        if cursor_first:
+            requests.reverse()
+        for headers, has_count in requests:
+            response = client.get(url, **headers)
+            assert response['X-Cache'] == 'MISS', (
+                'Проверьте, что режим пагинации из заголовка Accept входит '
+                'в ключ кеша ответов.'
+            )
+            assert ('count' in response.json()) is has_count
+
+    def test_04_parent_deleted(self, client, admin):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        review = Review.objects.create(
+            author=admin, title=title, text='t', score=5
+        )
+        reviews_url = f'/api/v1/titles/{title.id}/reviews/'
+        comments_url = f'{reviews_url}{review.id}/comments/'
+        for url in (reviews_url, comments_url):
+            assert client.get(url)['X-Cache'] == 'MISS'
+        review.delete()
+        response = client.get(comments_url)
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что после удаления отзыва его комментарии не '
+            'отдаются из кеша.'
+        )
+        title.delete()
+        response = client.get(reviews_url)
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что после удаления произведения его отзывы не '
+            'отдаются из кеша.'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10ConditionalRequests:
+
+    def test_01_not_modified(self, client, admin):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = client.get(url)
+        etag = response['ETag']
+        assert etag and response.has_header('Last-Modified')
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            f'Проверьте, что GET-запрос к `{url}` с актуальным '
+            '`If-None-Match` возвращает ответ со статусом 304.'
+        )
+
+        Review.objects.create(author=admin, title=title, text='t', score=5)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что ETag меняется после добавления отзыва.'
+        )
+
+    def test_02_if_match(self, admin_client, admin):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        review = Review.objects.create(
+            author=admin, title=title, text='t', score=5
+        )
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+        etag = admin_client.get(url)['ETag']
+
+        response = admin_client.patch(
+            url, data={'text': 'new'}, HTTP_IF_MATCH=etag
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = admin_client.patch(
+            url, data={'text': 'lost update'}, HTTP_IF_MATCH=etag
+        )
+        assert response.status_code == HTTPStatus.PRECONDITION_FAILED, (
+            f'Проверьте, что PATCH-запрос к `{url}` с устаревшим '
+            '`If-Match` возвращает ответ со статусом 412.'
+        )
+        response = admin_client.delete(url, HTTP_IF_MATCH=etag)
+        assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+        assert Review.objects.filter(pk=review.pk).exists()
+
+    def test_03_author_rename(self, client, user_client, user):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        Review.objects.create(author=user, title=title, text='t', score=5)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        etag = client.get(url)['ETag']
+        assert client.get(url)['X-Cache'] == 'HIT'
+
+        response = user_client.patch(
+            '/api/v1/users/me/', data={'username': 'renamed'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что ETag отзывов меняется при смене имени автора.'
+        )
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['results'][0]['author'] == 'renamed'
+
+    def test_04_preconditions_after_permissions(
+        self, client, user_client, admin_client, admin
+    ):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        review = Review.objects.create(
+            author=admin, title=title, text='t', score=5
+        )
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+        etag = client.get(url)['ETag']
+        admin_client.patch(url, data={'text': 'new'})
+
+        for api_client, expected in (
+            (client, HTTPStatus.UNAUTHORIZED),
+            (user_client, HTTPStatus.FORBIDDEN),
+        ):
+            response = api_client.patch(
+                url, data={'text': 'stale'}, HTTP_IF_MATCH=etag
+            )
+            assert response.status_code == expected, (
+                'Проверьте, что `If-Match` проверяется после проверки прав '
+                'и запрос без прав не получает ответ со статусом 412.'
+            )
+
+    def test_05_object_validators(self, admin_client, admin, user):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        other = Title.objects.create(name='Чужой', year=1979)
+        review = Review.objects.create(
+            author=admin, title=title, text='t', score=5
+        )
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+        etag = admin_client.get(url)['ETag']
+        Review.objects.create(author=user, title=other, text='t', score=5)
+        response = admin_client.patch(
+            url, data={'text': 'new'}, HTTP_IF_MATCH=etag
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что ETag отзыва не зависит от изменения других '
+            'отзывов.'
+        )
+
+        title_url = f'/api/v1/titles/{title.id}/'
+        etag = admin_client.get(title_url)['ETag']
+        title.genre.add(Genre.objects.create(name='Боевик', slug='action'))
+        response = admin_client.get(title_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что ETag произведения меняется вместе с жанрами.'
+        )
+
+    def test_06_etag_includes_accept(self, client):
+        Title.objects.create(name='Терминатор', year=1984)
+        url = '/api/v1/titles/'
+        etag = client.get(url)['ETag']
+        response = client.get(
+            url,
+            HTTP_ACCEPT='application/json; pagination=cursor',
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что ETag списка зависит от режима пагинации из '
+            'заголовка Accept.'
+        )
+        assert 'count' not in response.json()
+
+    def test_07_object_etag_without_generations(
+        self, admin_client, user_client, user
+    ):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        review = Review.objects.create(
+            author=user, title=title, text='t', score=5
+        )
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+        etag = admin_client.get(url)['ETag']
+        # Другой процесс со своим LocMemCache заводит поколения заново.
+        cache.clear()
+        assert admin_client.get(url)['ETag'] == etag, (
+            'Проверьте, что ETag объекта не зависит от поколений моделей '
+            'в локальном кеше процесса.'
+        )
+
+        user_client.patch('/api/v1/users/me/', data={'username': 'renamed'})
+        response = admin_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что ETag отзыва меняется при смене имени автора.'
+        )
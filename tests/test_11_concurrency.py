@@ -0,0 +1,66 @@
+import threading
+from http import HTTPStatus
+
+import pytest
+from django.db import connections
+from rest_framework.test import APIClient
+
+from reviews.models import Review, ScoreBucket, Title
+
+THREADS = 8
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11Concurrency:
+
+    def test_01_parallel_review_posts(self, token_user):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        barrier = threading.Barrier(THREADS)
+        statuses = []
+
+        def post_review():
+            client = APIClient()
+            client.credentials(
+                HTTP_AUTHORIZATION=f'Bearer {token_user["access"]}'
+            )
+            barrier.wait()
+            try:
+                response = client.post(url, data={'text': 't', 'score': 5})
+                statuses.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=post_review) for _ in range(THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(statuses) == (
+            [HTTPStatus.CREATED] + [HTTPStatus.BAD_REQUEST] * (THREADS - 1)
+        ), (
+            'Проверьте, что из параллельных POST-запросов одного '
+            'пользователя к `/api/v1/titles/{title_id}/reviews/` успешен '
+            'ровно один, а остальные получают ответ со статусом 400.'
+        )
+        assert Review.objects.filter(title=title).count() == 1
+
+
+@pytest.mark.django_db
+class Test11OuterTransaction:
+
+    def test_01_review_for_missing_title(self, user_client):
+        # Тест выполняется внутри транзакции, как при ATOMIC_REQUESTS:
+        # внешний ключ здесь до конца запроса не проверяется.
+        response = user_client.post(
+            '/api/v1/titles/999/reviews/', data={'text': 't', 'score': 5}
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что отзыв к несуществующему произведению '
+            'отклоняется со статусом 404 и внутри внешней транзакции.'
+        )
+        assert not Review.objects.exists()
+        assert not ScoreBucket.objects.filter(title_id=999).exists()
@@ -0,0 +1,123 @@
+from http import HTTPStatus
+
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+from reviews.models import QueuedEmail
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12EmailQueue:
+    url_signup = '/api/v1/auth/signup/'
+
+    def test_01_signup_enqueues_email(self, client, settings):
+        settings.EMAIL_QUEUE_ENABLED = True
+        outbox_before_count = len(mail.outbox)
+        valid_data = {'email': 'valid@yamdb.fake', 'username': 'valid'}
+
+        response = client.post(self.url_signup, data=valid_data)
+        assert response.status_code == HTTPStatus.OK
+        assert len(mail.outbox) == outbox_before_count, (
+            'Проверьте, что при включённой очереди письмо не отправляется '
+            'в запросе на регистрацию.'
+        )
+        assert QueuedEmail.objects.filter(
+            recipient=valid_data['email'], sent__isnull=True
+        ).count() == 1
+
+        call_command('send_queued_emails')
+        assert len(mail.outbox) == outbox_before_count + 1, (
+            'Проверьте, что команда send_queued_emails отправляет письма '
+            'из очереди.'
+        )
+        assert valid_data['email'] in mail.outbox[-1].to
+        assert not QueuedEmail.objects.filter(sent__isnull=True).exists()
+
+    def test_02_failed_email_is_retried_later(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_12_email_queue.FailingBackend'
+        email = QueuedEmail.objects.create(
+            recipient='valid@yamdb.fake', from_email='from@yamdb.fake',
+            subject='subject', message='message'
+        )
+        call_command('send_queued_emails')
+        email.refresh_from_db()
+        assert email.sent is None
+        assert email.attempts == 1
+        assert email.last_error, (
+            'Проверьте, что ошибка отправки сохраняется в очереди.'
+        )
+        assert email.next_attempt > email.created, (
+            'Проверьте, что повторная отправка откладывается.'
+        )
+
+    def test_03_unreachable_server(self, settings):
+        settings.EMAIL_BACKEND = (
+            'tests.test_12_email_queue.UnreachableBackend'
+        )
+        email = QueuedEmail.objects.create(
+            recipient='valid@yamdb.fake', from_email='from@yamdb.fake',
+            subject='subject', message='message'
+        )
+        call_command('send_queued_emails')
+        email.refresh_from_db()
+        assert (email.sent, email.attempts) == (None, 1), (
+            'Проверьте, что ошибка подключения к почтовому серверу '
+            'засчитывается как попытка отправки.'
+        )
+        assert email.last_error
+        assert email.next_attempt > email.created
+
+    def test_04_sent_outside_transaction_with_lease(self, settings):
+        settings.EMAIL_BACKEND = (
+            'tests.test_12_email_queue.TransactionCheckingBackend'
+        )
+        leased, expired = (
+            QueuedEmail.objects.create(
+                recipient='valid@yamdb.fake', from_email='from@yamdb.fake',
+                subject='subject', message='message',
+                leased_until=timezone.now() + delta,
+            )
+            for delta in (timedelta(minutes=5), -timedelta(minutes=5))
+        )
+        call_command('send_queued_emails')
+        leased.refresh_from_db()
+        expired.refresh_from_db()
+        assert leased.sent is None, (
+            'Проверьте, что письмо, закреплённое за другим процессом, '
+            'не отправляется повторно.'
+        )
+        assert expired.sent is not None, (
+            'Проверьте, что письмо с истёкшей арендой отправляется.'
+        )
+        assert expired.leased_until is None
+
+
+class TransactionCheckingBackend(BaseEmailBackend):
+
+    def send_messages(self, messages):
+        assert not connection.in_atomic_block, (
+            'Проверьте, что письма отправляются вне транзакции.'
+        )
+        mail.outbox.extend(messages)
+        return len(messages)
+
+
+class FailingBackend(BaseEmailBackend):
+
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+class UnreachableBackend(BaseEmailBackend):
+
+    def open(self):
+        raise ConnectionRefusedError('SMTP недоступен')
+
+    def send_messages(self, messages):
+        raise AssertionError('Соединение не открыто')
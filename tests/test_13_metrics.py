@@ -0,0 +1,129 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import pytest
+from rest_framework.test import APIClient
+
+from api.metrics import MetricsRegistry
+from reviews.models import Category, Title
+
+SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_metrics(text):
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith('#'):
+            continue
+        match = SAMPLE.match(line)
+        assert match, f'Строка `{line}` не соответствует формату Prometheus.'
+        name, labels, value = match.groups()
+        key = (name, tuple(sorted(LABEL.findall(labels or ''))))
+        samples[key] = float(value)
+    return samples
+
+
+def get_metrics(client):
+    response = client.get('/api/metrics')
+    assert response.status_code == HTTPStatus.OK
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    return parse_metrics(response.content.decode())
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13Metrics:
+
+    def test_01_request_metrics(self, client, admin_client):
+        category = Category.objects.create(name='Фильм', slug='films')
+        for idx in range(3):
+            Title.objects.create(
+                name=f'Произведение {idx}', year=2000, category=category
+            )
+        client.get('/api/v1/titles/?limit=2')
+        client.get('/api/v1/titles/?pagination=cursor&limit=2')
+        client.get('/api/v1/titles/0/')
+
+        samples = get_metrics(admin_client)
+        requests = (
+            'yamdb_http_requests_total',
+            (('method', 'GET'), ('route', 'titles'), ('status', '200')),
+        )
+        assert samples[requests] == 2, (
+            'Проверьте, что метрики считают запросы по basename маршрута.'
+        )
+        assert samples[(
+            'yamdb_http_requests_total',
+            (('method', 'GET'), ('route', 'titles'), ('status', '404')),
+        )] == 1
+        route = (('route', 'titles'),)
+        assert samples[(
+            'yamdb_http_request_duration_seconds_count', route
+        )] == 3
+        assert samples[(
+            'yamdb_http_request_duration_seconds_bucket',
+            (('le', '+Inf'), ('route', 'titles')),
+        )] == 3
+        assert samples[('yamdb_db_queries_per_request_sum', route)] > 0
+        assert samples[('yamdb_serializer_duration_seconds_total', route)] > 0
+        assert samples[(
+            'yamdb_paginated_responses_total',
+            (('mode', 'offset'), ('route', 'titles')),
+        )] == 1
+        assert samples[(
+            'yamdb_paginated_responses_total',
+            (('mode', 'cursor'), ('route', 'titles')),
+        )] == 1
+        assert samples[('yamdb_page_items_total', route)] == 4
+        assert (
+            'yamdb_response_cache_events_total', (('event', 'misses'),)
+        ) in samples
+
+    def test_02_histogram_buckets_cumulative(self):
+        registry = MetricsRegistry()
+        for duration in (0.001, 0.02, 0.02, 20):
+            registry.observe_request('titles', 'GET', 200, duration)
+        samples = parse_metrics(registry.render())
+        bucket = 'yamdb_http_request_duration_seconds_bucket'
+        assert samples[(bucket, (('le', '0.005'), ('route', 'titles')))] == 1
+        assert samples[(bucket, (('le', '0.025'), ('route', 'titles')))] == 3
+        assert samples[(bucket, (('le', '10.0'), ('route', 'titles')))] == 3
+        assert samples[(bucket, (('le', '+Inf'), ('route', 'titles')))] == 4
+
+    def test_03_registry_thread_safe(self):
+        registry = MetricsRegistry()
+
+        def observe(_):
+            for _ in range(500):
+                registry.observe_request('titles', 'GET', 200, 0.01, 3)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(observe, range(8)))
+        samples = parse_metrics(registry.render())
+        assert samples[(
+            'yamdb_db_queries_per_request_count', (('route', 'titles'),)
+        )] == 4000, (
+            'Проверьте, что реестр метрик не теряет данные при '
+            'одновременной записи из нескольких потоков.'
+        )
+
+    def test_04_metrics_access(self, client, user_client, admin_client,
+                               settings):
+        url = '/api/metrics'
+        assert client.get(url).status_code == HTTPStatus.UNAUTHORIZED, (
+            f'Проверьте, что `{url}` недоступен анонимному пользователю.'
+        )
+        assert user_client.get(url).status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что `{url}` доступен только администратору.'
+        )
+        get_metrics(admin_client)
+
+        settings.METRICS_TOKEN = 'scraper-token'
+        scraper = APIClient()
+        scraper.credentials(HTTP_AUTHORIZATION='Bearer scraper-token')
+        get_metrics(scraper)
+        scraper.credentials(HTTP_AUTHORIZATION='Bearer wrong-token')
+        assert scraper.get(url).status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что метрики не отдаются по неверному токену.'
+        )
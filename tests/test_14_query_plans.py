@@ -0,0 +1,115 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Category, Comment, Review, Title, User
+
+TITLES = 5000
+REVIEWED_TITLES = 100
+USERS = 50
+
+
+def seed_catalog():
+    category = Category.objects.create(name='Фильм', slug='films')
+    Title.objects.bulk_create(
+        Title(
+            id=idx,
+            name=f'Произведение {idx}',
+            year=1900 + idx % 120,
+            category=category,
+        )
+        for idx in range(1, TITLES + 1)
+    )
+    User.objects.bulk_create(
+        User(id=idx, username=f'user{idx}', email=f'user{idx}@yamdb.fake')
+        for idx in range(1, USERS + 1)
+    )
+    Review.objects.bulk_create(
+        Review(
+            id=(title_id - 1) * USERS + author_id,
+            title_id=title_id,
+            author_id=author_id,
+            text='text',
+            score=5,
+        )
+        for title_id in range(1, REVIEWED_TITLES + 1)
+        for author_id in range(1, USERS + 1)
+    )
+    Comment.objects.bulk_create(
+        Comment(review_id=review_id, author_id=1, text='text')
+        for review_id in range(1, REVIEWED_TITLES * USERS + 1, 10)
+        for _ in range(5)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def main_query(client, url, table):
+    """SQL, которым вьюсет выбирает страницу объектов из table."""
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    for query in context.captured_queries:
+        sql = query['sql']
+        if sql.startswith('SELECT') and f'FROM "{table}"' in sql and (
+            'LIMIT' in sql
+        ):
+            return sql
+    assert False, f'Не найден запрос к таблице `{table}` для `{url}`.'
+
+
+def explain(sql):
+    prefix = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else (
+        'EXPLAIN'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}')
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14QueryPlans:
+
+    @pytest.mark.parametrize('url,table,index', [
+        (
+            '/api/v1/titles/?name=Произведение 42',
+            'reviews_title',
+            'title_name_lower_idx',
+        ),
+        ('/api/v1/titles/?year=1950', 'reviews_title', 'title_year_idx'),
+        (
+            '/api/v1/titles/?year_min=1950&year_max=1951',
+            'reviews_title',
+            'title_year_idx',
+        ),
+        (
+            '/api/v1/titles/7/reviews/',
+            'reviews_review',
+            'review_title_pub_date_idx',
+        ),
+        (
+            '/api/v1/titles/7/reviews/?pagination=cursor',
+            'reviews_review',
+            'review_title_pub_date_idx',
+        ),
+        (
+            '/api/v1/titles/1/reviews/11/comments/?pagination=cursor',
+            'reviews_comment',
+            'comment_review_pub_date_idx',
+        ),
+    ])
+    def test_01_list_endpoints_use_indexes(self, client, url, table, index):
+        seed_catalog()
+        plan = explain(main_query(client, url, table))
+        assert index in plan, (
+            f'Проверьте, что запрос списка `{url}` использует индекс '
+            f'`{index}`. План запроса:\n{plan}'
+        )
+        assert f'SCAN {table}' not in plan.replace('"', ''), (
+            f'Запрос списка `{url}` читает таблицу `{table}` целиком. '
+            f'План запроса:\n{plan}'
+        )
+        assert 'TEMP B-TREE' not in plan, (
+            f'Проверьте, что сортировку `{url}` обеспечивает индекс. '
+            f'План запроса:\n{plan}'
+        )
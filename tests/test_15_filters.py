@@ -0,0 +1,135 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Category, Genre, Title
+
+
+def get_names(client, query):
+    response = client.get(f'/api/v1/titles/?{query}')
+    assert response.status_code == HTTPStatus.OK
+    return sorted(title['name'] for title in response.json()['results'])
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15Filters:
+
+    def test_01_slugs_normalized(self):
+        category = Category.objects.create(name='Фильм', slug='Films')
+        assert category.slug == 'films', (
+            'Проверьте, что слаг категории сохраняется в нижнем регистре.'
+        )
+        Genre.objects.bulk_create([Genre(name='Драма', slug='DRAMA')])
+        assert Genre.objects.filter(slug='drama').exists(), (
+            'Проверьте, что слаги нормализуются и при bulk_create.'
+        )
+
+    def test_02_filters_case_insensitive(self, client):
+        films = Category.objects.create(name='Фильм', slug='films')
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        title = Title.objects.create(
+            name='Сталкер', year=1979, category=films
+        )
+        title.genre.set([drama])
+        Title.objects.create(name='Солярис', year=1972)
+
+        assert get_names(client, 'name=сТАЛКЕР') == ['Сталкер'], (
+            'Проверьте, что фильтр name не зависит от регистра, в том '
+            'числе для кириллицы.'
+        )
+        assert get_names(client, 'category=FILMS') == ['Сталкер']
+        assert get_names(client, 'genre=Drama') == ['Сталкер']
+
+        title.name = 'Зеркало'
+        title.save()
+        assert get_names(client, 'name=зеркало') == ['Зеркало']
+        title.name = 'Жертвоприношение'
+        Title.objects.bulk_update([title], ['name'])
+        assert get_names(client, 'name=жертвоприношение') == [
+            'Жертвоприношение'
+        ], 'Проверьте, что bulk_update обновляет нормализованное название.'
+
+    def test_03_year_filters(self, client):
+        for year in (1972, 1979, 1986):
+            Title.objects.create(name=f'Фильм {year}', year=year)
+        assert get_names(client, 'year=1979') == ['Фильм 1979']
+        assert get_names(client, 'year_min=1979') == [
+            'Фильм 1979', 'Фильм 1986'
+        ]
+        assert get_names(client, 'year_max=1979') == [
+            'Фильм 1972', 'Фильм 1979'
+        ]
+        assert get_names(client, 'year_min=1973&year_max=1985') == [
+            'Фильм 1979'
+        ], 'Проверьте фильтрацию произведений по диапазону годов.'
+
+    def test_04_multi_value_filters(self, client):
+        films = Category.objects.create(name='Фильм', slug='films')
+        books = Category.objects.create(name='Книга', slug='books')
+        Category.objects.create(name='Музыка', slug='music')
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        fantasy = Genre.objects.create(name='Фантастика', slug='fantasy')
+        Genre.objects.create(name='Комедия', slug='comedy')
+        stalker = Title.objects.create(
+            name='Сталкер', year=1979, category=films
+        )
+        stalker.genre.set([drama, fantasy])
+        picnic = Title.objects.create(
+            name='Пикник на обочине', year=1972, category=books
+        )
+        picnic.genre.set([fantasy])
+        Title.objects.create(name='Сюита', year=1970)
+
+        response = client.get('/api/v1/titles/?genre__in=drama,FANTASY')
+        assert response.json()['count'] == 2, (
+            'Проверьте, что произведение с несколькими подходящими жанрами '
+            'возвращается фильтром genre__in один раз.'
+        )
+        assert get_names(client, 'genre__in=drama,fantasy') == [
+            'Пикник на обочине', 'Сталкер'
+        ]
+        assert get_names(client, 'genre__in=comedy') == []
+        assert get_names(client, 'category__in=films,books') == [
+            'Пикник на обочине', 'Сталкер'
+        ]
+        assert get_names(
+            client, 'genre__in=drama,fantasy&category__in=films'
+        ) == ['Сталкер']
+
+    def test_05_rating_ranges_and_ordering(self, client):
+        for name, year, rating in (
+            ('Б', 1980, 7), ('а', 1990, 9), ('В', 1970, None)
+        ):
+            Title.objects.create(name=name, year=year)
+            Title.objects.filter(name=name).update(rating=rating)
+
+        assert get_names(client, 'rating_min=8') == ['а']
+        assert get_names(client, 'rating_max=8') == ['Б']
+        assert get_names(client, 'rating_min=7&rating_max=9') == ['Б', 'а']
+
+        def ordered(query):
+            response = client.get(f'/api/v1/titles/?ordering={query}')
+            assert response.status_code == HTTPStatus.OK
+            return [title['name'] for title in response.json()['results']]
+
+        assert ordered('-rating')[:2] == ['а', 'Б']
+        assert ordered('year') == ['В', 'Б', 'а']
+        assert ordered('-year') == ['а', 'Б', 'В']
+        assert ordered('name') == ['а', 'Б', 'В'], (
+            'Проверьте, что сортировка по названию не зависит от регистра.'
+        )
+
+    def test_06_slug_case_collision(self, admin_client):
+        Genre.objects.create(name='Драма', slug='drama')
+        response = admin_client.post(
+            '/api/v1/genres/', data={'name': 'Драма 2', 'slug': 'Drama'}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что слаг, совпадающий с существующим без учёта '
+            'регистра, отклоняется со статусом 400.'
+        )
+        response = admin_client.post(
+            '/api/v1/genres/', data={'name': 'Комедия', 'slug': 'Comedy'}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['slug'] == 'comedy'
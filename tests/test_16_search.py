@@ -0,0 +1,97 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from reviews.models import Comment, Review, Title
+from reviews.search import get_backend
+
+
+def found(client, url, query):
+    response = client.get(url, {'search': query})
+    assert response.status_code == HTTPStatus.OK, (
+        f'Проверьте, что `{url}?search={query}` возвращает статус 200.'
+    )
+    return response.json()['results']
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16Search:
+
+    @pytest.fixture(autouse=True)
+    def clean_index(self):
+        # Таблица индекса не принадлежит моделям и не очищается между
+        # тестами вместе с остальными.
+        call_command('rebuild_search_index')
+
+    def test_01_index_available(self):
+        assert get_backend(connection) is not None, (
+            'Проверьте, что миграция создаёт полнотекстовый индекс.'
+        )
+
+    def test_02_titles_ranked(self, client):
+        Title.objects.create(
+            name='Пикник на обочине', year=1972,
+            description='Повесть о Зоне и сталкерах',
+        )
+        Title.objects.create(
+            name='Сталкер', year=1979, description='Фильм Тарковского'
+        )
+        Title.objects.create(name='Солярис', year=1972)
+
+        names = [
+            title['name']
+            for title in found(client, '/api/v1/titles/', 'СТАЛКЕР')
+        ]
+        assert names == ['Сталкер', 'Пикник на обочине'], (
+            'Проверьте, что поиск не зависит от регистра, находит слова по '
+            'префиксу и ставит совпадение в названии выше совпадения в '
+            'описании.'
+        )
+        assert found(client, '/api/v1/titles/', 'тарков зона') == []
+        assert [
+            title['name']
+            for title in found(client, '/api/v1/titles/', 'повесть зоне')
+        ] == ['Пикник на обочине']
+        for query in ('"', 'AND OR', 'NEAR(*', '-'):
+            found(client, '/api/v1/titles/', query)
+
+    def test_03_reviews_and_comments(self, client, user, admin):
+        title = Title.objects.create(name='Сталкер', year=1979)
+        other = Title.objects.create(name='Солярис', year=1972)
+        review = Review.objects.create(
+            title=title, author=user, text='Медленное кино', score=8
+        )
+        Review.objects.create(
+            title=other, author=user, text='Медленное кино', score=7
+        )
+        Comment.objects.create(
+            review=review, author=admin, text='Согласен про медленное'
+        )
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        assert [item['id'] for item in found(client, url, 'медленн')] == [
+            review.id
+        ], 'Проверьте, что поиск отзывов ограничен произведением.'
+        comments_url = f'{url}{review.id}/comments/'
+        assert len(found(client, comments_url, 'согласен')) == 1
+
+        review.text = 'Гениальная притча'
+        review.save()
+        assert found(client, url, 'медленн') == [], (
+            'Проверьте, что индекс обновляется при изменении отзыва.'
+        )
+        assert len(found(client, url, 'притча')) == 1
+        review.delete()
+        assert found(client, url, 'притча') == [], (
+            'Проверьте, что удалённые объекты исчезают из индекса.'
+        )
+
+    def test_04_fallback_without_index(self, client, monkeypatch):
+        Title.objects.create(name='Сталкер', year=1979)
+        monkeypatch.setattr(
+            'reviews.search.get_backend', lambda connection: None
+        )
+        assert len(found(client, '/api/v1/titles/', 'талк')) == 1, (
+            'Проверьте, что без индекса поиск выполняется через icontains.'
+        )
@@ -0,0 +1,124 @@
+import pytest
+from django.core.management import CommandError, call_command
+
+from api.cache import get_generations
+from reviews.models import Comment, Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17Counters:
+
+    def test_01_counters_in_responses(self, client, admin, user):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        review = Review.objects.create(
+            author=admin, title=title, text='text', score=10
+        )
+        Review.objects.create(author=user, title=title, text='text', score=5)
+        for author in (admin, user, user):
+            Comment.objects.create(author=author, review=review, text='text')
+
+        data = client.get(f'/api/v1/titles/{title.id}/').json()
+        assert data['reviews_count'] == 2, (
+            'Проверьте, что произведение выводит количество отзывов.'
+        )
+        data = client.get(
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+        ).json()
+        assert data['comments_count'] == 3, (
+            'Проверьте, что отзыв выводит количество комментариев.'
+        )
+
+    def test_02_counters_follow_deletes(self, admin, user, moderator):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        review = Review.objects.create(
+            author=admin, title=title, text='text', score=10
+        )
+        Review.objects.create(author=user, title=title, text='text', score=5)
+        Comment.objects.create(author=user, review=review, text='text')
+        Comment.objects.create(author=moderator, review=review, text='text')
+        Comment.objects.first().delete()
+        review.refresh_from_db()
+        assert review.comments_count == 1
+
+        user.delete()
+        moderator.delete()
+        review.refresh_from_db()
+        title.refresh_from_db()
+        assert review.comments_count == 0, (
+            'Проверьте, что счётчик комментариев учитывает каскадное '
+            'удаление пользователя.'
+        )
+        assert title.rating_count == 1, (
+            'Проверьте, что счётчик отзывов учитывает каскадное удаление '
+            'пользователя.'
+        )
+
+    def test_03_save_keeps_counters(self, admin, user):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        review = Review.objects.create(
+            author=admin, title=title, text='text', score=10
+        )
+        stale_title = Title.objects.get(pk=title.pk)
+        stale_review = Review.objects.get(pk=review.pk)
+        Review.objects.create(author=user, title=title, text='text', score=5)
+        Comment.objects.create(author=user, review=review, text='text')
+
+        stale_review.text = 'new text'
+        stale_review.save()
+        stale_title.name = 'Терминатор 2'
+        stale_title.save()
+        review.refresh_from_db()
+        title.refresh_from_db()
+        assert (review.text, review.comments_count) == ('new text', 1), (
+            'Проверьте, что сохранение отзыва не перезаписывает счётчик '
+            'комментариев устаревшим значением.'
+        )
+        assert (title.name, title.rating_count) == ('Терминатор 2', 2)
+
+    def test_04_rebuild_counters(self, admin, user):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        review = Review.objects.create(
+            author=admin, title=title, text='text', score=8
+        )
+        Comment.objects.create(author=user, review=review, text='text')
+        Title.objects.update(rating_sum=0, rating_count=0, rating=None)
+        Review.objects.update(comments_count=5)
+        with pytest.raises(CommandError):
+            call_command('rebuild_counters', check=True)
+        call_command('rebuild_counters', batch_size=1)
+        call_command('rebuild_counters', check=True)
+        title.refresh_from_db()
+        review.refresh_from_db()
+        assert (title.rating_count, review.comments_count) == (1, 1), (
+            'Проверьте, что команда rebuild_counters исправляет счётчики.'
+        )
+
+    def test_05_counter_invalidates_reviews(self, admin, user):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        review = Review.objects.create(
+            author=admin, title=title, text='text', score=8
+        )
+        for change in (
+            lambda: Comment.objects.create(
+                author=user, review=review, text='text'
+            ),
+            lambda: Comment.objects.get().delete(),
+        ):
+            generations = get_generations([Review])
+            change()
+            assert get_generations([Review]) != generations, (
+                'Проверьте, что изменение счётчика комментариев сбрасывает '
+                'закешированные данные отзывов.'
+            )
+
+    @pytest.mark.parametrize('batch_size', ['0', '-1'])
+    def test_06_batch_size_validated(self, admin, batch_size):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        Review.objects.create(author=admin, title=title, text='t', score=5)
+        Title.objects.update(rating_count=0)
+        with pytest.raises(CommandError):
+            call_command('rebuild_counters', '--batch-size', batch_size)
+        assert Title.objects.get().rating_count == 0, (
+            'Проверьте, что `--batch-size` меньше 1 отклоняется до сверки '
+            'счётчиков.'
+        )
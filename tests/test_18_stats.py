@@ -0,0 +1,133 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Review, ScoreBucket, Title
+from reviews.ratings import rebuild_score_buckets
+
+
+def histogram(**counts):
+    return {str(score): counts.get(f's{score}', 0) for score in range(1, 11)}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18Stats:
+
+    def test_01_stats(self, client, admin, user, moderator):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        url = f'/api/v1/titles/{title.id}/stats/'
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что `{url}` доступен без авторизации.'
+        )
+        assert response.json() == {
+            'count': 0, 'mean': None, 'median': None,
+            'histogram': histogram(),
+        }, 'Проверьте статистику произведения без отзывов.'
+
+        for author, score in ((admin, 10), (user, 7), (moderator, 2)):
+            Review.objects.create(
+                author=author, title=title, text='text', score=score
+            )
+        assert client.get(url).json() == {
+            'count': 3, 'mean': 6.33, 'median': 7.0,
+            'histogram': histogram(s2=1, s7=1, s10=1),
+        }, 'Проверьте, что статистика учитывает новые отзывы.'
+
+        review = Review.objects.get(author=moderator)
+        review.score = 8
+        review.save()
+        Review.objects.get(author=admin).delete()
+        assert client.get(url).json() == {
+            'count': 2, 'mean': 7.5, 'median': 7.5,
+            'histogram': histogram(s7=1, s8=1),
+        }, 'Проверьте, что статистика учитывает изменение и удаление отзывов.'
+
+        assert client.get('/api/v1/titles/0/stats/').status_code == (
+            HTTPStatus.NOT_FOUND
+        )
+
+    def test_02_stats_does_not_read_reviews(self, client, admin, user):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        for author in (admin, user):
+            Review.objects.create(
+                author=author, title=title, text='text', score=5
+            )
+        with CaptureQueriesContext(connection) as queries:
+            client.get(f'/api/v1/titles/{title.id}/stats/')
+        assert not any(
+            Review._meta.db_table in query['sql']
+            for query in queries.captured_queries
+        ), 'Проверьте, что статистика не читает отзывы произведения.'
+
+    def test_03_rebuild_score_buckets(self, admin, user):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        for author, score in ((admin, 9), (user, 9)):
+            Review.objects.create(
+                author=author, title=title, text='text', score=score
+            )
+        ScoreBucket.objects.all().delete()
+        with pytest.raises(CommandError):
+            call_command('rebuild_score_buckets', check=True)
+        call_command('rebuild_score_buckets')
+        call_command('rebuild_score_buckets', check=True)
+        assert dict(
+            ScoreBucket.objects.filter(title=title).values_list(
+                'score', 'count'
+            )
+        ) == {score: 2 if score == 9 else 0 for score in range(1, 11)}, (
+            'Проверьте, что команда rebuild_score_buckets восстанавливает '
+            'распределение оценок.'
+        )
+
+    def test_04_rebuild_in_batches(self, admin, user):
+        titles = [
+            Title.objects.create(name=f'Произведение {idx}', year=2000)
+            for idx in range(3)
+        ]
+        for title, author, score in (
+            (titles[0], admin, 3), (titles[0], user, 5), (titles[2], user, 7)
+        ):
+            Review.objects.create(
+                author=author, title=title, text='text', score=score
+            )
+        ScoreBucket.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            created = rebuild_score_buckets(ScoreBucket, Review, batch_size=10)
+        assert created == 30
+        inserts = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('INSERT')
+        ]
+        assert len(inserts) == 3, (
+            'Проверьте, что корзины оценок вставляются пачками по '
+            '`batch_size` строк.'
+        )
+        assert set(
+            ScoreBucket.objects.filter(count__gt=0).values_list(
+                'title_id', 'score', 'count'
+            )
+        ) == {(titles[0].id, 3, 1), (titles[0].id, 5, 1), (titles[2].id, 7, 1)}
+
+    def test_05_stale_score_edits(self, admin):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        review = Review.objects.create(
+            author=admin, title=title, text='text', score=5
+        )
+        first = Review.objects.get(pk=review.pk)
+        second = Review.objects.get(pk=review.pk)
+        first.score = 7
+        first.save()
+        second.score = 9
+        second.save()
+        assert dict(
+            ScoreBucket.objects.filter(count__gt=0).values_list(
+                'score', 'count'
+            )
+        ) == {9: 1}, (
+            'Проверьте, что отзыв переносится между корзинами по оценке, '
+            'сохранённой в базе, а не по устаревшему экземпляру.'
+        )
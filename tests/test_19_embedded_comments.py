@@ -0,0 +1,94 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Comment, Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19EmbeddedComments:
+
+    @pytest.fixture
+    def thread(self, admin, user, moderator):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        reviews = [
+            Review.objects.create(
+                author=author, title=title, text='text', score=5
+            )
+            for author in (admin, user, moderator)
+        ]
+        for number in range(5):
+            Comment.objects.create(
+                author=user, review=reviews[0], text=f'Первый {number}'
+            )
+        Comment.objects.create(
+            author=admin, review=reviews[1], text='Второй'
+        )
+        return f'/api/v1/titles/{title.id}/reviews/'
+
+    def test_01_embed_comments(self, client, thread):
+        response = client.get(thread, {'embed': 'comments'})
+        assert response.status_code == HTTPStatus.OK
+        embedded = {
+            review['comments_count']: [
+                comment['text'] for comment in review['comments']
+            ]
+            for review in response.json()['results']
+        }
+        assert embedded == {
+            5: ['Первый 4', 'Первый 3', 'Первый 2'],
+            1: ['Второй'],
+            0: [],
+        }, (
+            'Проверьте, что `?embed=comments` выводит у каждого отзыва '
+            'последние комментарии, новые первыми.'
+        )
+        data = client.get(
+            thread, {'embed': 'comments', 'comments_limit': 1}
+        ).json()
+        assert [
+            len(review['comments']) for review in data['results']
+        ] == [0, 1, 1], 'Проверьте, что работает параметр `comments_limit`.'
+        assert 'comments' not in client.get(thread).json()['results'][0], (
+            'Проверьте, что без `embed` комментарии не выводятся.'
+        )
+
+    @pytest.mark.parametrize('limit', ('0', '-1', 'abc', '1000'))
+    def test_02_invalid_limit(self, client, thread, limit):
+        response = client.get(
+            thread, {'embed': 'comments', 'comments_limit': limit}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что недопустимый `comments_limit` возвращает '
+            'статус 400.'
+        )
+
+    def test_03_one_query_for_comments(self, client, thread):
+        client.get(thread)
+        with CaptureQueriesContext(connection) as queries:
+            client.get(thread, {'embed': 'comments', 'comments_limit': 2})
+        comment_queries = [
+            query['sql'] for query in queries.captured_queries
+            if Comment._meta.db_table in query['sql']
+        ]
+        assert len(comment_queries) == 1, (
+            'Проверьте, что комментарии всей страницы выбираются одним '
+            'запросом.'
+        )
+        assert 'ROW_NUMBER' in comment_queries[0].upper()
+        assert len(queries) == 2, (
+            'Проверьте, что страница отзывов с комментариями - это два '
+            'SQL-запроса.'
+        )
+
+    def test_04_cache_follows_comments(self, client, thread, user):
+        client.get(thread, {'embed': 'comments'})
+        review = Review.objects.get(author__username='TestUser')
+        Comment.objects.create(author=user, review=review, text='Новый')
+        data = client.get(thread, {'embed': 'comments'}).json()
+        assert any(
+            comment['text'] == 'Новый'
+            for item in data['results'] for comment in item['comments']
+        ), 'Проверьте, что кеш отзывов сбрасывается при новых комментариях.'
@@ -0,0 +1,63 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Comment, Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20NestedRoutes:
+
+    @pytest.fixture
+    def routes(self, admin):
+        title = Title.objects.create(name='Терминатор', year=1984)
+        other = Title.objects.create(name='Чужой', year=1979)
+        review = Review.objects.create(
+            author=admin, title=title, text='text', score=5
+        )
+        comment = Comment.objects.create(
+            author=admin, review=review, text='text'
+        )
+        return title, other, review, comment
+
+    def test_01_mismatched_parents(self, user_client, routes):
+        title, other, review, comment = routes
+        base = f'/api/v1/titles/{other.id}/reviews/{review.id}/comments/'
+        for method, url in (
+            ('get', base),
+            ('get', f'{base}{comment.id}/'),
+            ('post', base),
+            ('patch', f'{base}{comment.id}/'),
+            ('delete', f'{base}{comment.id}/'),
+        ):
+            response = getattr(user_client, method)(url, {'text': 'Новый'})
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                f'Проверьте, что {method.upper()} `{url}` для отзыва другого '
+                'произведения возвращает ответ со статусом 404.'
+            )
+        assert Comment.objects.count() == 1
+        response = user_client.get(f'/api/v1/titles/{other.id}/reviews/')
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что произведение без отзывов отдаёт пустой список.'
+        )
+        response = user_client.get('/api/v1/titles/0/reviews/')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_02_parent_chain_in_one_query(self, user_client, routes):
+        title, other, review, comment = routes
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.post(url, {'text': 'Новый'})
+        assert response.status_code == HTTPStatus.CREATED
+        parent_queries = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+            and f'FROM "{Review._meta.db_table}"' in query['sql']
+        ]
+        assert len(parent_queries) == 1, (
+            'Проверьте, что цепочка произведение - отзыв проверяется '
+            'одним запросом.'
+        )
+        assert '"title_id"' in parent_queries[0]
@@ -0,0 +1,88 @@
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.authentication import USER_CACHE_KEY
+from reviews.models import Title, User
+
+
+def claims_client(user):
+    response = APIClient().post('/api/v1/auth/token/', data={
+        'username': user.username,
+        'confirmation_code': default_token_generator.make_token(user),
+    })
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}'
+    )
+    return client
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21JWTClaims:
+
+    def test_01_role_change_in_other_process(self, admin):
+        client = claims_client(admin)
+        url = '/api/v1/categories/'
+        response = client.post(url, data={'name': 'Фильм', 'slug': 'films'})
+        assert response.status_code == HTTPStatus.CREATED
+
+        # Роль меняется в другом процессе: сигнал не сбрасывает здешний
+        # кеш, claims перестают действовать после истечения его срока.
+        User.objects.filter(pk=admin.pk).update(
+            role=User.UserRoles.USER, claims_version=F('claims_version') + 1
+        )
+        cache.delete(USER_CACHE_KEY.format(admin.pk))
+        response = client.post(url, data={'name': 'Книги', 'slug': 'books'})
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что claims токена сверяются с версией claims '
+            'пользователя в базе.'
+        )
+
+    def test_02_cached_user_without_password(self, admin):
+        claims_client(admin)
+        cached = cache.get(USER_CACHE_KEY.format(admin.pk))
+        assert cached is not None and 'password' not in cached.__dict__, (
+            'Проверьте, что в кеше пользователя нет хеша пароля.'
+        )
+
+    def test_03_deleted_user(self, user):
+        client = claims_client(user)
+        title = Title.objects.create(name='Терминатор', year=1984)
+        User.objects.filter(pk=user.pk).delete()
+        response = client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'text', 'score': 5},
+        )
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что токен удалённого пользователя не принимается.'
+        )
+
+    def test_04_token_claims_skip_user_lookup(self, admin):
+        client = claims_client(admin)
+        data = {'name': 'Фильм', 'slug': 'films'}
+        with CaptureQueriesContext(connection) as context:
+            response = client.post('/api/v1/categories/', data=data)
+        assert response.status_code == HTTPStatus.CREATED
+        assert not any(
+            'reviews_user' in query['sql']
+            for query in context.captured_queries
+        ), (
+            'Проверьте, что аутентификация по токену с ролью в claims не '
+            'загружает пользователя из базы.'
+        )
+
+        admin.role = User.UserRoles.USER
+        admin.save()
+        data = {'name': 'Книги', 'slug': 'books'}
+        response = client.post('/api/v1/categories/', data=data)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что после смены роли claims старого токена '
+            'больше не используются.'
+        )
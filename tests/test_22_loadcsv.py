@@ -0,0 +1,100 @@
+import os
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError
+
+from reviews.management.commands import loadcsv
+from reviews.models import Category, Comment, Review, Title, User
+
+CSV_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'csv', '')
+
+
+def load(monkeypatch, *args, path=CSV_DIR):
+    monkeypatch.setattr(loadcsv, 'FILE_PATH', path)
+    stdout, stderr = StringIO(), StringIO()
+    call_command('loadcsv', *args, stdout=stdout, stderr=stderr)
+    return stdout.getvalue(), stderr.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22LoadCSV:
+
+    def test_01_jobs_validated(self, monkeypatch):
+        with pytest.raises(CommandError):
+            load(monkeypatch, '--jobs', '0')
+        assert not Category.objects.exists()
+
+    def test_02_jobs_sequential_on_sqlite(self, monkeypatch):
+        _, stderr = load(monkeypatch, '--jobs', '3')
+        assert 'последовательно' in stderr, (
+            'Проверьте, что на SQLite `--jobs` больше 1 сообщает о '
+            'последовательной загрузке.'
+        )
+        assert User.objects.count() == 2
+        assert Title.objects.count() == 3
+        assert Review.objects.count() == 3
+        assert Comment.objects.count() == 2
+
+        _, stderr = load(monkeypatch, '--mode', 'upsert', '--jobs', '3')
+        assert Category.objects.count() == 3, (
+            'Проверьте, что повторная загрузка в режиме upsert с `--jobs` '
+            'не падает с "database is locked" и не дублирует строки.'
+        )
+        assert Review.objects.get(pk=1).comments_count == 2
+
+    @pytest.mark.parametrize('batch_size', ['0', '-1'])
+    def test_03_batch_size_validated(self, monkeypatch, batch_size):
+        with pytest.raises(CommandError):
+            load(monkeypatch, 'category', '--batch-size', batch_size)
+        assert not Category.objects.exists(), (
+            'Проверьте, что `--batch-size` меньше 1 отклоняется до загрузки.'
+        )
+
+    def test_04_batches(self, monkeypatch):
+        stdout, _ = load(
+            monkeypatch, 'category', '--batch-size', '2', '--verbosity', '2'
+        )
+        assert 'category: загружено 2 строк' in stdout
+        assert 'category: загружено 3 строк' in stdout, (
+            'Проверьте, что файл загружается пачками по `--batch-size` строк.'
+        )
+        assert sorted(
+            Category.objects.values_list('slug', flat=True)
+        ) == ['book', 'movie', 'music']
+
+    def test_05_upsert_and_skip_existing(self, monkeypatch):
+        load(monkeypatch, 'category')
+        upsert_dir = os.path.join(CSV_DIR, 'upsert', '')
+        with pytest.raises(IntegrityError):
+            load(monkeypatch, 'category', path=upsert_dir)
+
+        stdout, _ = load(
+            monkeypatch, 'category', '--mode', 'skip-existing',
+            '--batch-size', '1', path=upsert_dir
+        )
+        assert 'добавлено 1, обновлено 0, пропущено 1' in stdout
+        assert Category.objects.get(pk=1).name == 'Фильм', (
+            'Проверьте, что режим skip-existing не меняет существующие строки.'
+        )
+
+        Category.objects.filter(pk=4).delete()
+        stdout, _ = load(
+            monkeypatch, 'category', '--mode', 'upsert', path=upsert_dir
+        )
+        assert 'добавлено 1, обновлено 1, пропущено 0' in stdout
+        assert dict(Category.objects.values_list('pk', 'name')) == {
+            1: 'Кино', 2: 'Книга', 3: 'Музыка', 4: 'Игры',
+        }, 'Проверьте, что режим upsert обновляет и добавляет строки.'
+
+    @pytest.mark.parametrize('mode', ['upsert', 'skip-existing'])
+    def test_06_unique_conflict_not_ignored(self, monkeypatch, mode):
+        load(monkeypatch, 'category')
+        conflict_dir = os.path.join(CSV_DIR, 'conflict', '')
+        with pytest.raises(IntegrityError):
+            load(monkeypatch, 'category', '--mode', mode, path=conflict_dir)
+        assert not Category.objects.filter(pk=5).exists(), (
+            'Проверьте, что строка с занятым слагом не считается '
+            'добавленной.'
+        )
@@ -0,0 +1,29 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23Signup:
+
+    def test_01_signup_queries(self, client):
+        url = '/api/v1/auth/signup/'
+        data = {'email': 'valid@yamdb.fake', 'username': 'valid'}
+
+        def user_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = client.post(url, data=data)
+            assert response.status_code == 200
+            return [
+                query['sql'].split()[0] for query in context.captured_queries
+                if 'reviews_user' in query['sql']
+            ]
+
+        assert user_queries() == ['INSERT'], (
+            'Проверьте, что регистрация нового пользователя выполняет '
+            'один INSERT в таблицу пользователей.'
+        )
+        assert user_queries() == ['INSERT', 'SELECT'], (
+            'Проверьте, что повторная регистрация выполняет не больше '
+            'одного SELECT после отклонённого INSERT.'
+        )
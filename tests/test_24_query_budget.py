@@ -0,0 +1,26 @@
+import pytest
+from django.core.cache import cache
+
+from api.middleware import QueryBudgetExceeded, query_shape
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24QueryBudget:
+
+    def test_01_query_budget(self, client, settings):
+        response = client.get('/api/v1/categories/')
+        assert not response.has_header('X-Query-Count'), (
+            'Проверьте, что статистика SQL-запросов не отдаётся в '
+            'заголовках без DEBUG или QUERY_STATS_HEADERS.'
+        )
+        settings.QUERY_STATS_HEADERS = True
+        cache.clear()
+        response = client.get('/api/v1/categories/')
+        assert int(response['X-Query-Count']) > 0
+        settings.QUERY_BUDGETS = {'CategoryViewSet': 0}
+        cache.clear()
+        with pytest.raises(QueryBudgetExceeded):
+            client.get('/api/v1/categories/')
+        assert query_shape('WHERE id IN (%s, %s, %s)') == (
+            'WHERE id IN (%s, ...)'
+        )
@@ -0,0 +1,107 @@
+import pytest
+from django.utils import timezone
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Review, Title, User
+
+
+def create_reviews(count):
+    title = Title.objects.create(name='Терминатор', year=1984)
+    for idx in range(count):
+        author = User.objects.create(
+            username=f'author{idx}', email=f'author{idx}@yamdb.fake'
+        )
+        Review.objects.create(
+            author=author, title=title, text=f'text {idx}', score=5
+        )
+    return title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25Pagination:
+
+    def test_01_reviews_cursor_pagination(self, client):
+        title = create_reviews(25)
+        url = f'/api/v1/titles/{title.id}/reviews/?pagination=cursor&limit=10'
+        seen = []
+        with CaptureQueriesContext(connection) as context:
+            while url:
+                response = client.get(url)
+                assert response.status_code == 200
+                data = response.json()
+                assert 'count' not in data, (
+                    'Проверьте, что курсорная пагинация не считает '
+                    'количество объектов.'
+                )
+                seen.extend(review['id'] for review in data['results'])
+                url = data['next']
+        assert sorted(seen) == sorted(
+            Review.objects.values_list('id', flat=True)
+        ), (
+            'Проверьте, что курсорная пагинация по отзывам возвращает '
+            'каждый отзыв ровно один раз.'
+        )
+        assert not any(
+            'COUNT(' in query['sql'] for query in context.captured_queries
+        ), 'Курсорная пагинация не должна выполнять COUNT(*).'
+
+    def test_02_cursor_mode_from_accept_header(self, client):
+        title = create_reviews(3)
+        response = client.get(
+            f'/api/v1/titles/{title.id}/reviews/',
+            HTTP_ACCEPT='application/json; pagination=cursor'
+        )
+        assert response.status_code == 200
+        assert set(response.json()) == {'next', 'previous', 'results'}, (
+            'Проверьте, что курсорная пагинация включается параметром '
+            '`pagination=cursor` в заголовке Accept.'
+        )
+
+    def test_03_cached_count(self, client):
+        title = create_reviews(3)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        assert client.get(url).json()['count'] == 3
+        with CaptureQueriesContext(connection) as context:
+            assert client.get(url).json()['count'] == 3
+        assert not any(
+            'COUNT(' in query['sql'] for query in context.captured_queries
+        ), 'Проверьте, что количество отзывов берётся из кеша.'
+
+        author = User.objects.create(username='late', email='late@yamdb.fake')
+        Review.objects.create(author=author, title=title, text='t', score=1)
+        assert client.get(url).json()['count'] == 4, (
+            'Проверьте, что кеш количества сбрасывается при создании отзыва.'
+        )
+
+    def test_04_cursor_ties_without_offset(self, client):
+        title = create_reviews(7)
+        Review.objects.update(pub_date=timezone.now())
+        url = f'/api/v1/titles/{title.id}/reviews/?pagination=cursor&limit=3'
+        seen = []
+        with CaptureQueriesContext(connection) as context:
+            while url:
+                data = client.get(url).json()
+                seen.extend(review['id'] for review in data['results'])
+                url = data['next']
+        assert seen == sorted(seen, reverse=True), (
+            'Проверьте, что отзывы с одинаковой датой упорядочены по id.'
+        )
+        assert sorted(seen) == sorted(
+            Review.objects.values_list('id', flat=True)
+        ), (
+            'Проверьте, что курсорная пагинация возвращает каждый отзыв '
+            'с одинаковой датой ровно один раз.'
+        )
+        assert not any(
+            'OFFSET' in query['sql'] for query in context.captured_queries
+        ), 'Курсор должен сравнивать (pub_date, id), а не пропускать OFFSET.'
+
+        previous = client.get(
+            client.get(
+                f'/api/v1/titles/{title.id}/reviews/?pagination=cursor&limit=3'
+            ).json()['next']
+        ).json()['previous']
+        assert [
+            review['id'] for review in client.get(previous).json()['results']
+        ] == seen[:3], 'Проверьте ссылку на предыдущую страницу.'
@@ -0,0 +1,37 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from reviews.models import Category, Review, Title, User
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26SeedCatalog:
+
+    def test_01_sequences_reset(self, monkeypatch, admin_client):
+        reset = []
+        sequence_reset_sql = connection.ops.sequence_reset_sql
+
+        def spy(style, models):
+            reset.extend(models)
+            return sequence_reset_sql(style, models)
+
+        monkeypatch.setattr(connection.ops, 'sequence_reset_sql', spy)
+        call_command(
+            'seed_catalog', '--users', '3', '--categories', '2',
+            '--genres', '2', '--titles', '4', '--reviews-per-title', '2',
+            '--comments-per-review', '1', stdout=StringIO(),
+        )
+        assert set(reset) >= {User, Category, Title, Review}, (
+            'Проверьте, что после загрузки с явными id команда '
+            'seed_catalog сбрасывает последовательности id.'
+        )
+
+        response = admin_client.post(
+            '/api/v1/categories/', data={'name': 'Новая', 'slug': 'new'}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        assert Category.objects.get(slug='new').pk > 2